@@ -5,14 +5,21 @@
     'author': 'Links4Engg',
     'category': 'Generic Modules/Human Resources',
     "license": "OPL-1",
-    "depends": ["hr", 'hr_holidays','hr_payroll', 'l10n_in_hr_payroll'],
+    "depends": ["hr", 'hr_holidays','hr_payroll', 'l10n_in_hr_payroll', 'l4e_biotime_connector'],
     "data": [
         # Security
         "security/leave_access_group.xml",
         'security/ir.model.access.csv',
 
+        # Data
+        'data/ir_cron_data.xml',
+        'data/payroll_group_policy_data.xml',
+
         # Views
         'views/hr_group_leave_views.xml',
+        'views/hr_payslip_run_views.xml',
+        'views/hr_payslip_stale_views.xml',
+        'views/payroll_group_policy_views.xml',
         'reports/payslip_report_template.xml',
         # 'views/hr_attendance_approval_views.xml',
         # "views/hr_leave_rule.xml",
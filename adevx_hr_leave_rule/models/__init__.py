@@ -1,8 +1,11 @@
 from . import hr_leave_inherit
 from . import hr_leave_type
 from . import hr_working_schedule  
+from . import payroll_group_policy
 from . import hr_festival_holiday
 from . import hr_payslip 
+from . import hr_payslip_run
+from . import hr_attendance_payslip
 from . import hr_payslip_worked_days
 from . import hr_employee
 
@@ -0,0 +1,56 @@
+# models/hr_attendance_payslip.py
+from odoo import models, api
+
+# attendance fields the payslip computation depends on
+PAYROLL_FIELDS = {'employee_id', 'check_in', 'check_out'}
+
+
+class HrAttendance(models.Model):
+    _inherit = 'hr.attendance'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        attendances = super().create(vals_list)
+        attendances._mark_payslips_stale()
+        return attendances
+
+    def write(self, vals):
+        if not PAYROLL_FIELDS.intersection(vals):
+            return super().write(vals)
+        before = self._payslip_stale_days()
+        res = super().write(vals)
+        self._mark_payslips_stale(before)
+        return res
+
+    def unlink(self):
+        self._mark_payslips_stale()
+        return super().unlink()
+
+    def _payslip_stale_days(self):
+        return {(att.employee_id.id, att.local_date) for att in self if att.employee_id and att.local_date}
+
+    def _mark_payslips_stale(self, before=None):
+        """Flag the draft payslips covering these attendances (and their
+        values ``before`` a write) for recompute.
+
+        Under the Biotime sync the days are only collected in the
+        ``attendance_changed_days`` context set and flagged once per flush
+        by :meth:`_attendance_days_changed`."""
+        days = self._payslip_stale_days() | (before or set())
+        collected = self.env.context.get('attendance_changed_days')
+        if collected is not None:
+            collected.update(days)
+            return
+        self._mark_payslip_days_stale(days)
+
+    @api.model
+    def _attendance_days_changed(self, days):
+        super()._attendance_days_changed(days)
+        self._mark_payslip_days_stale(days)
+
+    @api.model
+    def _mark_payslip_days_stale(self, days):
+        if not days:
+            return
+        dates = [date for _employee_id, date in days]
+        self.env['hr.payslip']._mark_stale({employee_id for employee_id, _date in days}, min(dates), max(dates))
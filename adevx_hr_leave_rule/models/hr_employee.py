@@ -7,3 +7,9 @@ class HrEmployee(models.Model):
     esi_amount = fields.Monetary(string="ESI Amount")
     bank_amount = fields.Monetary(string="Bank Salary Amount")
     cash_amount = fields.Monetary(string="Cash Salary Amount")
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'bank_amount' in vals or 'cash_amount' in vals:
+            self.env['hr.payslip']._mark_stale(self.ids)
+        return res
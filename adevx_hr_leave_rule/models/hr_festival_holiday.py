@@ -16,5 +16,28 @@ class HrFestivalHoliday(models.Model):
         for rec in self:
             rec.year = rec.date.year if rec.date else 0
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        holidays = super().create(vals_list)
+        holidays._mark_payslips_stale()
+        return holidays
+
+    def write(self, vals):
+        if 'date' in vals:
+            self._mark_payslips_stale()
+        res = super().write(vals)
+        if 'date' in vals:
+            self._mark_payslips_stale()
+        return res
+
+    def unlink(self):
+        self._mark_payslips_stale()
+        return super().unlink()
+
+    def _mark_payslips_stale(self):
+        dates = [d for d in self.mapped('date') if d]
+        if dates:
+            self.env['hr.payslip']._mark_stale(None, min(dates), max(dates))
+
     def name_get(self):
         return [(rec.id, f"{rec.name} ({rec.date})") for rec in self]
@@ -53,6 +53,35 @@ class HrLeave(models.Model):
     )
 
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        leaves = super().create(vals_list)
+        leaves._mark_payslips_stale()
+        return leaves
+
+    def write(self, vals):
+        stale_fields = {'state', 'employee_id', 'date_from', 'date_to', 'holiday_status_id', 'x_is_paid_override'}
+        if not stale_fields.intersection(vals):
+            return super().write(vals)
+        self._mark_payslips_stale()
+        res = super().write(vals)
+        self._mark_payslips_stale()
+        return res
+
+    def unlink(self):
+        self._mark_payslips_stale()
+        return super().unlink()
+
+    def _mark_payslips_stale(self):
+        """Flag the draft payslips overlapping these leaves for recompute."""
+        leaves = self.filtered(lambda l: l.employee_id and l.date_from and l.date_to)
+        if leaves:
+            self.env['hr.payslip']._mark_stale(
+                set(leaves.employee_id.ids),
+                min(leaves.mapped('date_from')).date(),
+                max(leaves.mapped('date_to')).date(),
+            )
+
     @api.depends('number_of_days')
     def _compute_approval_level(self):
         for rec in self:
@@ -4,10 +4,23 @@ from odoo.exceptions import UserError
 from datetime import timedelta, datetime, time
 import logging
 
+from .payroll_group_policy import DEFAULT_POLICY
+
 _logger = logging.getLogger(__name__)
 
 FESTIVAL_HOLIDAY_MODEL = 'hr.festival.holiday'
 
+# code -> name of the work entry types used by the worked-days lines
+WORK_ENTRY_TYPES = {
+    'WORK100': 'Attendance',
+    'SUNDAY': 'Paid Sunday',
+    'FESTIVAL': 'Paid Festival',
+    'PAIDLEAVE': 'Paid Leave',
+    'LOPCOMP': 'LOP Compensated',
+    'DOUBLEPAY': 'Double Pay',
+    'LOP': 'Unpaid',
+}
+
 
 class HrPayslip(models.Model):
     _inherit = 'hr.payslip'
@@ -249,6 +262,94 @@ class HrPayslip(models.Model):
     present_days = fields.Float(string="Present Days", readonly=True)
     absent_days_before_comp = fields.Float(string="Absent Days (Before Compensation)", readonly=True)
     total_ot_days = fields.Float(string="Total OT Days", readonly=True)
+
+    is_stale = fields.Boolean(
+        string="Needs Recompute",
+        readonly=True,
+        copy=False,
+        index=True,
+        help="Attendance, leaves, festivals or the bank/cash split of the employee "
+             "changed since this payslip was computed."
+    )
+    stale_error = fields.Text(
+        string="Recompute Error",
+        readonly=True,
+        copy=False,
+        help="Error of the last automatic recompute; the payslip is retried once "
+             "its inputs change again or it is computed manually."
+    )
+
+    # -------------------------------------------------------
+    # Stale Tracking
+    # -------------------------------------------------------
+
+    @api.model
+    def _mark_stale(self, employee_ids=None, date_from=None, date_to=None):
+        """Flag the draft payslips of ``employee_ids`` (all employees if None)
+        overlapping ``date_from``..``date_to`` (any period if not given) as
+        needing a recompute. One search and one write."""
+        domain = [
+            ('state', 'in', ('draft', 'verify')),
+            '|', ('is_stale', '=', False), ('stale_error', '!=', False),
+        ]
+        if employee_ids is not None:
+            if not employee_ids:
+                return
+            domain.append(('employee_id', 'in', list(employee_ids)))
+        if date_from:
+            domain.append(('date_to', '>=', date_from))
+        if date_to:
+            domain.append(('date_from', '<=', date_to))
+        self.sudo().search(domain)._flag_stale()
+
+    def _flag_stale(self):
+        """Flag these payslips as needing a recompute, with one write."""
+        slips = self.filtered(lambda s: s.state in ('draft', 'verify') and (not s.is_stale or s.stale_error))
+        if slips:
+            slips.write({'is_stale': True, 'stale_error': False})
+
+    def action_recompute_stale(self):
+        """Recompute the stale draft payslips among ``self`` (every stale one
+        when called without records)."""
+        slips = self or self.search([('is_stale', '=', True)])
+        slips = slips.filtered(lambda s: s.is_stale and s.state in ('draft', 'verify'))
+        if slips:
+            slips.compute_sheet()
+        return True
+
+    @api.model
+    def cron_recompute_stale(self):
+        """Recompute stale draft payslips in committed batches of
+        ``payroll.compute_batch_size`` (50).
+
+        A batch that fails is retried one slip at a time; a failing slip is
+        logged and gets its ``stale_error``, which keeps it out of the next
+        runs instead of blocking every batch after it."""
+        batch_size = int(self.env['ir.config_parameter'].sudo().get_param('payroll.compute_batch_size', 50))
+        domain = [
+            ('is_stale', '=', True),
+            ('stale_error', '=', False),
+            ('state', 'in', ('draft', 'verify')),
+        ]
+        while True:
+            slips = self.search(domain, limit=batch_size)
+            if not slips:
+                break
+            try:
+                with self.env.cr.savepoint():
+                    slips.compute_sheet()
+            except Exception:
+                self.env.invalidate_all(flush=False)
+                for slip in slips:
+                    try:
+                        with self.env.cr.savepoint():
+                            slip.compute_sheet()
+                    except Exception as e:
+                        self.env.invalidate_all(flush=False)
+                        _logger.exception("Recompute of stale payslip %s failed", slip.id)
+                        slip.stale_error = str(e) or e.__class__.__name__
+            self.env.cr.commit()
+
     # -------------------------------------------------------
     # Helpers
     # -------------------------------------------------------
@@ -259,6 +360,21 @@ class HrPayslip(models.Model):
             wet = self.env['hr.work.entry.type'].create({'name': name, 'code': code})
         return wet
 
+    def _get_work_entry_type_ids(self):
+        """Return {code: id} of the worked-days line types, with one search;
+        missing types are created with one multi-create."""
+        WorkEntryType = self.env['hr.work.entry.type']
+        type_ids = {}
+        for wet in WorkEntryType.search([('code', 'in', list(WORK_ENTRY_TYPES))]):
+            type_ids.setdefault(wet.code, wet.id)
+        missing = [code for code in WORK_ENTRY_TYPES if code not in type_ids]
+        if missing:
+            created = WorkEntryType.create([
+                {'name': WORK_ENTRY_TYPES[code], 'code': code} for code in missing
+            ])
+            type_ids.update(zip(missing, created.ids))
+        return type_ids
+
     def _get_festival_dates(self, date_from, date_to):
         holidays = self.env[FESTIVAL_HOLIDAY_MODEL].search([
             ('date', '>=', date_from),
@@ -266,356 +382,342 @@ class HrPayslip(models.Model):
         ])
         return {h.date for h in holidays if h.date}
 
-    def _build_attendance_map(self, employee, date_from, date_to):
-
-        attendances = self.env['hr.attendance'].search([
-            ('employee_id', '=', employee.id),
-            ('check_in', '>=', datetime.combine(date_from, time.min)),
-            ('check_in', '<=', datetime.combine(date_to, time.max)),
-        ])
-
-        att_map = {}
-        for att in attendances:
-            if not att.check_in:
-                continue
-            work_date = fields.Datetime.context_timestamp(att, att.check_in).date()
-            hours = att.worked_hours or 0.0
-            att_map[work_date] = att_map.get(work_date, 0) + hours
+    def _build_attendance_maps(self, employee_ids, date_from, date_to):
+        """Return {employee_id: {local_date: worked hours}} for all
+        ``employee_ids`` with a single SQL aggregate."""
+        return self.env['hr.attendance']._get_worked_hours_map(employee_ids, date_from, date_to)
 
-        return att_map
+    def _build_attendance_map(self, employee, date_from, date_to):
+        return self._build_attendance_maps([employee.id], date_from, date_to).get(employee.id, {})
+
+    def _prepare_compute_batch(self):
+        """Load once what computing every slip of ``self`` needs: attendance
+        hours of all employees, festivals and worked-days line types over
+        the union of the slip periods."""
+        slips = self.filtered('employee_id')
+        if not slips:
+            return {}
+        date_from = min(slips.mapped('date_from'))
+        date_to = max(slips.mapped('date_to'))
+        return {
+            'attendance': self._build_attendance_maps(slips.employee_id.ids, date_from, date_to),
+            'festivals': self._get_festival_dates(date_from, date_to),
+            'work_entry_types': self._get_work_entry_type_ids(),
+            'policies': self.env['payroll.group.policy']._get_compiled_policies(),
+        }
 
     # -------------------------------------------------------
     # Main Compute
     # -------------------------------------------------------
 
     def compute_sheet(self):
-
-        for payslip in self:
-
-            employee = payslip.employee_id
-            if not employee:
+        """Compute the group LOP/OT values and worked-days lines of all
+        slips, then run the salary rules.
+
+        Data shared by the slips is loaded once (see
+        :meth:`_prepare_compute_batch`), every slip is computed in memory and
+        all worked-days lines are written with a single multi-create, so a
+        whole payslip batch costs a few queries instead of several per slip.
+        Worked-days lines whose values did not change are left untouched.
+        """
+        slips = self.filtered('employee_id')
+        batch = slips._prepare_compute_batch()
+
+        to_create = []
+        to_unlink = self.env['hr.payslip.worked_days']
+        for payslip in slips:
+            vals, lines = payslip._compute_payslip_values(batch)
+            vals['is_stale'] = False
+            vals['stale_error'] = False
+            payslip.write(vals)
+            create_vals, obsolete = payslip._sync_worked_days_lines(lines)
+            to_create += create_vals
+            to_unlink |= obsolete
+        to_unlink.unlink()
+        self.env['hr.payslip.worked_days'].create(to_create)
+
+        return self._compute_sheet_post(super().compute_sheet())
+
+    def _sync_worked_days_lines(self, lines):
+        """Match the computed worked-days ``lines`` with the existing ones by
+        (code, name): changed lines are written in place. Returns the values
+        of the lines to create and the existing lines to delete."""
+        self.ensure_one()
+        existing = {(line.code, line.name): line for line in self.worked_days_line_ids}
+        to_create = []
+        for vals in lines:
+            line = existing.pop((vals['code'], vals['name']), None)
+            if not line:
+                to_create.append(dict(vals, payslip_id=self.id))
+                continue
+            changed = {
+                fname: value for fname, value in vals.items()
+                if (line[fname].id if fname == 'work_entry_type_id' else line[fname]) != value
+            }
+            if changed:
+                line.write(changed)
+        return to_create, self.env['hr.payslip.worked_days'].union(*existing.values())
+
+    def _compute_payslip_values(self, batch):
+        """Return (payslip values, worked-days line values) of one slip,
+        computed from the data loaded by :meth:`_prepare_compute_batch`
+        without any query of its own."""
+        self.ensure_one()
+        payslip = self
+        employee = payslip.employee_id
+
+        version = payslip.version_id
+        cal = version.resource_calendar_id if version else employee.resource_calendar_id
+        group = cal.employee_group_rule if cal else False
+        policy = batch['policies'].get(group, DEFAULT_POLICY)
+
+        date_from = payslip.date_from
+        date_to = payslip.date_to
+        wage = payslip._get_contract_wage() or 0.0
+
+        # ---------------------------------------------------
+        # Calendar Days
+        # ---------------------------------------------------
+        all_days = []
+        cur = date_from
+        while cur <= date_to:
+            all_days.append(cur)
+            cur += timedelta(days=1)
+
+        total_days = len(all_days)
+        per_day = wage / total_days if total_days else 0
+
+        def is_sunday(d):
+            return d.weekday() == 6
+
+        festival_dates = {d for d in batch['festivals'] if date_from <= d <= date_to}
+        sunday_days = {d for d in all_days if is_sunday(d)}
+
+        # ---------------------------------------------------
+        # Working Days per Group Policy
+        # ---------------------------------------------------
+
+        if policy.all_days_working:
+            # All days working
+            working_days = list(all_days)
+        else:
+            # Mon-Sat working
+            working_days = [d for d in all_days if not is_sunday(d)]
+
+        saturday_days = {d for d in all_days if d.weekday() == 5}
+
+        # Festivals that fall on actual working days (none when all days are working)
+        if policy.all_days_working:
+            paid_festival_days_val = 0
+        else:
+            paid_festival_days_val = len(festival_dates & set(working_days))
+
+        # ---------------------------------------------------
+        # Attendance Map
+        # ---------------------------------------------------
+        att_map = batch['attendance'].get(employee.id, {})
+        attended_dates = set(att_map.keys())
+
+        # ---------------------------------------------------
+        # Attendance Classification
+        # ---------------------------------------------------
+        present_days = 0
+        absent_days = 0
+
+        for d in working_days:
+
+            # Festival auto paid for groups exempting festivals
+            if policy.festival_exempt and d in festival_dates:
                 continue
 
-            version = payslip.version_id
-            cal = version.resource_calendar_id if version else employee.resource_calendar_id
-            group = cal.employee_group_rule if cal else False
+            fraction = policy.day_fraction(att_map.get(d, 0))
+            present_days += fraction
+            absent_days += 1 - fraction
 
-            date_from = payslip.date_from
-            date_to = payslip.date_to
-            wage = payslip._get_contract_wage() or 0.0
+        # ---------------------------------------------------
+        # GROUP POLICY: leave credits, then Sunday/festival OT
+        # ---------------------------------------------------
 
-            payslip.worked_days_line_ids.unlink()
+        sunday_worked = 0
+        festival_worked = 0
+        lop_compensated = 0
+        double_pay_days = 0
 
-            # ---------------------------------------------------
-            # Calendar Days
-            # ---------------------------------------------------
-            all_days = []
-            cur = date_from
-            while cur <= date_to:
-                all_days.append(cur)
-                cur += timedelta(days=1)
+        casual_leave = min(policy.casual_leave_days, absent_days)
+        absent_days -= casual_leave
 
-            total_days = len(all_days)
-            payslip.total_days_in_month = total_days
-            per_day = wage / total_days if total_days else 0
+        paid_leave_credit = min(policy.paid_leave_credit_days, absent_days)
+        absent_days -= paid_leave_credit
 
-            def is_sunday(d):
-                return d.weekday() == 6
+        if policy.ot_compensation:
+            sunday_worked = sum(policy.day_fraction(att_map.get(d, 0)) for d in sunday_days
+                                if d in attended_dates and d not in festival_dates)
+            festival_worked = sum(policy.day_fraction(att_map.get(d, 0)) for d in festival_dates
+                                  if d in attended_dates)
 
-            festival_dates = self._get_festival_dates(date_from, date_to)
-            sunday_days = {d for d in all_days if is_sunday(d)}
+            total_ot = sunday_worked + festival_worked
 
-            # ---------------------------------------------------
-            # Working Days per Group
-            # ---------------------------------------------------
+            lop_compensated = min(absent_days, total_ot)
+            absent_days -= lop_compensated
 
-            if group == 'group_4':
-                # All days working
-                working_days = list(all_days)
-            else:
-                # Mon-Sat working
-                working_days = [d for d in all_days if not is_sunday(d)]
+            double_pay_days = total_ot - lop_compensated
 
-            saturday_days = {d for d in all_days if d.weekday() == 5}
+        final_lop = absent_days
 
-            # Festivals that fall on actual working days (Mon-Sat for Group 1-3, none for Group 4)
-            if group == 'group_4':
-                paid_festival_days_val = 0
-            else:
-                paid_festival_days_val = len(festival_dates & set(working_days))
-
-            payslip.total_working_days_in_month = len(working_days)
-            payslip.total_sundays_in_month = len(sunday_days)
-            payslip.total_festival_days_in_month = len(festival_dates)
-            payslip.total_saturdays_in_month = len(saturday_days)
-            payslip.paid_festival_days = paid_festival_days_val
-            payslip.required_attendance_days = len(working_days) - paid_festival_days_val
-
-            # ---------------------------------------------------
-            # Attendance Map
-            # ---------------------------------------------------
-            att_map = self._build_attendance_map(employee, date_from, date_to)
-            attended_dates = set(att_map.keys())
-
-            # ---------------------------------------------------
-            # Attendance Classification
-            # ---------------------------------------------------
-            present_days = 0
-            absent_days = 0
-
-            for d in working_days:
-
-                # Festival auto paid ONLY for Group 1-3
-                if group in ('group_1', 'group_2', 'group_3', 'group_5') and d in festival_dates:
-                    continue
-
-                hrs = att_map.get(d, 0)
-
-                if hrs >= 6:                                                              
-                    present_days += 1
-                elif 3 <= hrs < 6:
-                    present_days += 0.5
-                    absent_days += 0.5
-                else:
-                    absent_days += 1
-
-            # ---------------------------------------------------
-            # GROUP LOGIC
-            # ---------------------------------------------------
-
-            casual_leave = 0
-            paid_leave_credit = 0
-            sunday_worked = 0
-            festival_worked = 0
-            lop_compensated = 0
-            double_pay_days = 0
-
-            # GROUP 1
-            if group == 'group_1':
-                casual_leave = min(1, absent_days)
-                absent_days -= casual_leave
-
-            # GROUP 2 & 3
-            if group in ('group_2', 'group_3'):
-
-                if group == 'group_2':
-                    paid_leave_credit = min(1, absent_days)
-                    absent_days -= paid_leave_credit
-
-                def day_fraction(d):
-                    hrs = att_map.get(d, 0)
-                    if hrs >= 6:
-                        return 1.0
-                    elif hrs >= 3:
-                        return 0.5
-                    return 0.0
-
-                sunday_worked = sum(day_fraction(d) for d in sunday_days
-                                    if d in attended_dates and d not in festival_dates)
-                festival_worked = sum(day_fraction(d) for d in festival_dates if d in attended_dates)
-
-                total_ot = sunday_worked + festival_worked
-
-                lop_compensated = min(absent_days, total_ot)
-                absent_days -= lop_compensated
-
-                double_pay_days = total_ot - lop_compensated
-
-            # GROUP 4
-            if group == 'group_4':
-                # No leave, no compensation, no OT
-                sunday_worked = 0
-                festival_worked = 0
-                lop_compensated = 0
-                double_pay_days = 0
-
-            final_lop = absent_days
-
-            # ---------------------------------------------------
-            # Salary
-            # ---------------------------------------------------
-
-            unpaid_amount = round(final_lop * per_day, 2)
-            extra_ot_amount = round(double_pay_days * per_day, 2)
-
-            regular_salary_val = round(wage - unpaid_amount, 2)
-            gross_salary_val = round(regular_salary_val + extra_ot_amount, 2)
-
-            # ---------------------------------------------------
-            # Bank & Cash Split Logic
-            # ---------------------------------------------------
-
-            bank_amount = employee.bank_amount or 0.0
-            cash_amount = employee.cash_amount or 0.0
-            
-            # If employee defined split
-            if bank_amount or cash_amount:
+        # ---------------------------------------------------
+        # Salary
+        # ---------------------------------------------------
 
-                total_defined = bank_amount + cash_amount
+        unpaid_amount = round(final_lop * per_day, 2)
+        extra_ot_amount = round(double_pay_days * per_day, 2)
 
-                if total_defined == 0:
-                    bank_final = 0
-                    cash_final = 0
-                    pf = 0.0
-                    esi = 0.0
-                else:
-                    # LOP deducted proportionally from bank and cash
-                    per_day_bank = bank_amount / total_days if total_days else 0
-                    per_day_cash = cash_amount / total_days if total_days else 0
-
-                    bank_lop_deduction = round(final_lop * per_day_bank, 2)
-                    cash_lop_deduction = round(final_lop * per_day_cash, 2)
-                    
-                    # Calculate all positive allowance inputs (Salary Advance, Travel Allowance, etc.) and deduction inputs
-                    salary_inputs_allowances = sum(l.amount for l in payslip.input_line_ids if l.amount > 0 and 'DED' not in (l.code or '').upper() and not (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper()))
-                    salary_inputs_deductions = sum(l.amount for l in payslip.input_line_ids if l.amount > 0 and ('DED' in (l.code or '').upper() or (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper())))
-
-                    bank_after_lop = bank_amount - bank_lop_deduction
-                    
-                    cash_after_lop = cash_amount - cash_lop_deduction + extra_ot_amount
-                   
-                    # PF = 12% of 70% of bank after LOP
-                    # ESI = 0.75% of PF base
-                    pf_base = round(bank_after_lop * 0.70, 2)
-                    pf = round(pf_base * 0.12, 2)
-                    esi = round(bank_after_lop * 0.0075, 2)
-                    _logger.debug("pf_base = %s; pf = %s; esi = %s", pf_base, pf, esi)
-                    # Subtract employee deductions (PF and ESI) and add salary inputs (Travel Allowance, Advances) to bank payable.
-                    bank_final = round(bank_after_lop - pf - esi + salary_inputs_allowances - salary_inputs_deductions, 2)
-                    _logger.debug("bank_final = %s", bank_final)
-                    cash_final = round(cash_after_lop, 2)
+        regular_salary_val = round(wage - unpaid_amount, 2)
+        gross_salary_val = round(regular_salary_val + extra_ot_amount, 2)
 
-            else:
-                # No split defined → entire salary to bank
-                pf_base = round(gross_salary_val * 0.70, 2)
-                pf = round(pf_base * 0.12, 2)
-                esi = round(pf_base * 0.0075, 2)
-                # Subtract employee deductions (PF and ESI) from bank payable.
-                bank_final = round(gross_salary_val - pf - esi, 2)
-                cash_final = 0
+        # ---------------------------------------------------
+        # Bank & Cash Split Logic
+        # ---------------------------------------------------
 
-            # Net payable is the sum of net bank and net cash payables
-            net_payable_val = round(bank_final + cash_final, 2)
+        bank_amount = employee.bank_amount or 0.0
+        cash_amount = employee.cash_amount or 0.0
 
-            # Store values
-            payslip.bank_payable = round(bank_final, 2)
-            payslip.cash_payable = round(cash_final, 2)
-            payslip.esi_deduction = esi
-            payslip.pf_deduction = pf
+        # If employee defined split
+        if bank_amount or cash_amount:
 
-            payslip.unpaid_days = final_lop
-            payslip.paid_days = present_days + casual_leave + paid_leave_credit + lop_compensated + double_pay_days
-            payslip.unpaid_amount = unpaid_amount
+            total_defined = bank_amount + cash_amount
+
+            if total_defined == 0:
+                bank_final = 0
+                cash_final = 0
+                pf = 0.0
+                esi = 0.0
+            else:
+                # LOP deducted proportionally from bank and cash
+                per_day_bank = bank_amount / total_days if total_days else 0
+                per_day_cash = cash_amount / total_days if total_days else 0
+
+                bank_lop_deduction = round(final_lop * per_day_bank, 2)
+                cash_lop_deduction = round(final_lop * per_day_cash, 2)
+
+                # Calculate all positive allowance inputs (Salary Advance, Travel Allowance, etc.) and deduction inputs
+                salary_inputs_allowances, salary_inputs_deductions = payslip._get_salary_input_totals()
+
+                bank_after_lop = bank_amount - bank_lop_deduction
+
+                cash_after_lop = cash_amount - cash_lop_deduction + extra_ot_amount
+
+                # PF = pf_rate (12%) of pf_base_rate (70%) of bank after LOP
+                # ESI = esi_rate (0.75%) of bank after LOP
+                pf_base = round(bank_after_lop * policy.pf_base_rate, 2)
+                pf = round(pf_base * policy.pf_rate, 2)
+                esi = round(bank_after_lop * policy.esi_rate, 2)
+                _logger.debug("pf_base = %s; pf = %s; esi = %s", pf_base, pf, esi)
+                # Subtract employee deductions (PF and ESI) and add salary inputs (Travel Allowance, Advances) to bank payable.
+                bank_final = round(bank_after_lop - pf - esi + salary_inputs_allowances - salary_inputs_deductions, 2)
+                _logger.debug("bank_final = %s", bank_final)
+                cash_final = round(cash_after_lop, 2)
+
+        else:
+            # No split defined → entire salary to bank
+            pf_base = round(gross_salary_val * policy.pf_base_rate, 2)
+            pf = round(pf_base * policy.pf_rate, 2)
+            esi = round(pf_base * policy.esi_rate, 2)
+            # Subtract employee deductions (PF and ESI) from bank payable.
+            bank_final = round(gross_salary_val - pf - esi, 2)
+            cash_final = 0
+
+        # Net payable is the sum of net bank and net cash payables
+        net_payable_val = round(bank_final + cash_final, 2)
+
+        vals = {
+            'total_days_in_month': total_days,
+            'total_working_days_in_month': len(working_days),
+            'total_sundays_in_month': len(sunday_days),
+            'total_festival_days_in_month': len(festival_dates),
+            'total_saturdays_in_month': len(saturday_days),
+            'paid_festival_days': paid_festival_days_val,
+            'required_attendance_days': len(working_days) - paid_festival_days_val,
+
+            'bank_payable': round(bank_final, 2),
+            'cash_payable': round(cash_final, 2),
+            'esi_deduction': esi,
+            'pf_deduction': pf,
+
+            'unpaid_days': final_lop,
+            'paid_days': present_days + casual_leave + paid_leave_credit + lop_compensated + double_pay_days,
+            'unpaid_amount': unpaid_amount,
             # Total Paid Amount = net paid to employee (gross payables - employee deductions).
-            payslip.paid_amount = net_payable_val
-            payslip.regular_salary = regular_salary_val
-            payslip.ot_amount = extra_ot_amount
-            payslip.gross_salary = gross_salary_val
-            payslip.net_payable = net_payable_val
-            payslip.double_pay_days = double_pay_days
-            payslip.lop_compensated_days = lop_compensated
-            payslip.sunday_worked_days = sunday_worked
-            payslip.festival_worked_days = festival_worked
-            payslip.present_days = present_days
-            payslip.absent_days_before_comp = lop_compensated + final_lop
-            payslip.total_ot_days = sunday_worked + festival_worked
-
-            # ---------------------------------------------------
-            # Build Lines
-            # ---------------------------------------------------
-            def wet(code, name):
-                return self._get_or_create_work_entry_type(code, name).id
-
-            lines = []
-
-            if present_days:
-                lines.append({
-                    'name': 'Attendance',
-                    'code': 'WORK100',
-                    'number_of_days': present_days,
-                    'number_of_hours': present_days * 8,
-                    'amount': round(present_days * per_day, 2),
-                    'work_entry_type_id': wet('WORK100', 'Attendance'),
-                })
-
-            if group != 'group_4':
-                lines.append({
-                    'name': 'Paid Sunday',
-                    'code': 'SUNDAY',
-                    'number_of_days': len(sunday_days),
-                    'number_of_hours': len(sunday_days) * 8,
-                    'amount': round(len(sunday_days) * per_day, 2),
-                    'work_entry_type_id': wet('SUNDAY', 'Paid Sunday'),
-                })
-
-                if festival_dates:
-                    lines.append({
-                        'name': 'Paid Festival',
-                        'code': 'FESTIVAL',
-                        'number_of_days': len(festival_dates),
-                        'number_of_hours': len(festival_dates) * 8,
-                        'amount': round(len(festival_dates) * per_day, 2),
-                        'work_entry_type_id': wet('FESTIVAL', 'Paid Festival'),
-                    })
-
-            if casual_leave:
-                lines.append({
-                    'name': 'Paid Leave',
-                    'code': 'PAIDLEAVE',
-                    'number_of_days': casual_leave,
-                    'number_of_hours': casual_leave * 8,
-                    'amount': round(casual_leave * per_day, 2),
-                    'work_entry_type_id': wet('PAIDLEAVE', 'Paid Leave'),
-                })
-
-            if paid_leave_credit:
-                lines.append({
-                    'name': 'Paid Leave (Group 2)',
-                    'code': 'PAIDLEAVE',
-                    'number_of_days': paid_leave_credit,
-                    'number_of_hours': paid_leave_credit * 8,
-                    'amount': round(paid_leave_credit * per_day, 2),
-                    'work_entry_type_id': wet('PAIDLEAVE', 'Paid Leave'),
-                })
-
-            if lop_compensated:
-                lines.append({
-                    'name': 'LOP Compensated',
-                    'code': 'LOPCOMP',
-                    'number_of_days': lop_compensated,
-                    'number_of_hours': lop_compensated * 8,
-                    'amount': round(lop_compensated * per_day, 2),
-                    'work_entry_type_id': wet('LOPCOMP', 'LOP Compensated'),
-                })
-
-            if double_pay_days:
-                lines.append({
-                    'name': 'Double Pay (OT)',
-                    'code': 'DOUBLEPAY',
-                    'number_of_days': double_pay_days,
-                    'number_of_hours': double_pay_days * 8,
-                    'amount': round(double_pay_days * per_day, 2),
-                    'work_entry_type_id': wet('DOUBLEPAY', 'Double Pay'),
-                })
-
-            if final_lop:
-                lines.append({
-                    'name': 'Absent / LOP',
-                    'code': 'LOP',
-                    'number_of_days': final_lop,
-                    'number_of_hours': final_lop * 8,
-                    'amount': 0.0,
-                    'work_entry_type_id': wet('LOP', 'Unpaid'),
-                })
-
-            payslip.worked_days_line_ids = [(0, 0, v) for v in lines]
-
-        res = super().compute_sheet()
+            'paid_amount': net_payable_val,
+            'regular_salary': regular_salary_val,
+            'ot_amount': extra_ot_amount,
+            'gross_salary': gross_salary_val,
+            'net_payable': net_payable_val,
+            'double_pay_days': double_pay_days,
+            'lop_compensated_days': lop_compensated,
+            'sunday_worked_days': sunday_worked,
+            'festival_worked_days': festival_worked,
+            'present_days': present_days,
+            'absent_days_before_comp': lop_compensated + final_lop,
+            'total_ot_days': sunday_worked + festival_worked,
+        }
+
+        # ---------------------------------------------------
+        # Build Lines
+        # ---------------------------------------------------
+        wet = batch['work_entry_types']
+
+        def line(name, code, days, amount):
+            return {
+                'name': name,
+                'code': code,
+                'number_of_days': days,
+                'number_of_hours': days * 8,
+                'amount': amount,
+                'work_entry_type_id': wet[code],
+            }
+
+        lines = []
+
+        if present_days:
+            lines.append(line('Attendance', 'WORK100', present_days, round(present_days * per_day, 2)))
+
+        if not policy.all_days_working:
+            lines.append(line('Paid Sunday', 'SUNDAY', len(sunday_days), round(len(sunday_days) * per_day, 2)))
+
+            if festival_dates:
+                lines.append(line('Paid Festival', 'FESTIVAL', len(festival_dates), round(len(festival_dates) * per_day, 2)))
+
+        if casual_leave:
+            lines.append(line('Paid Leave', 'PAIDLEAVE', casual_leave, round(casual_leave * per_day, 2)))
+
+        if paid_leave_credit:
+            lines.append(line('Paid Leave (Group 2)', 'PAIDLEAVE', paid_leave_credit, round(paid_leave_credit * per_day, 2)))
+
+        if lop_compensated:
+            lines.append(line('LOP Compensated', 'LOPCOMP', lop_compensated, round(lop_compensated * per_day, 2)))
+
+        if double_pay_days:
+            lines.append(line('Double Pay (OT)', 'DOUBLEPAY', double_pay_days, round(double_pay_days * per_day, 2)))
+
+        if final_lop:
+            lines.append(line('Absent / LOP', 'LOP', final_lop, 0.0))
+
+        return vals, lines
+
+    def _get_salary_input_totals(self):
+        """Return (allowances, deductions) of the positive salary inputs; an
+        input is a deduction when its code or input type code contains DED."""
+        self.ensure_one()
+        allowances = sum(l.amount for l in self.input_line_ids if l.amount > 0 and 'DED' not in (l.code or '').upper() and not (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper()))
+        deductions = sum(l.amount for l in self.input_line_ids if l.amount > 0 and ('DED' in (l.code or '').upper() or (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper())))
+        return allowances, deductions
 
+    def _compute_sheet_post(self, res):
+        """Sync bank payable and the Net/Bank salary lines with the salary
+        inputs once the standard salary rules are computed."""
         for payslip in self:
             # Sync Net Salary and Bank Payable with Salary Inputs after standard salary rules calculation
-            salary_inputs_allowances = sum(l.amount for l in payslip.input_line_ids if l.amount > 0 and 'DED' not in (l.code or '').upper() and not (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper()))
-            salary_inputs_deductions = sum(l.amount for l in payslip.input_line_ids if l.amount > 0 and ('DED' in (l.code or '').upper() or (l.input_type_id and 'DED' in (l.input_type_id.code or '').upper())))
+            salary_inputs_allowances, salary_inputs_deductions = payslip._get_salary_input_totals()
 
             # 1. Update Bank Payable & Cash Payable
             bank_val = payslip.bank_payable
@@ -0,0 +1,194 @@
+# models/hr_payslip_run.py
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# code of the cron jobs computing queued chunks; the cron runner runs
+# several of them in parallel, duplicating one adds a worker
+COMPUTE_WORKER_CODE = 'model._cron_compute_chunks()'
+
+
+class HrPayslipRun(models.Model):
+    _inherit = 'hr.payslip.run'
+
+    compute_chunk_ids = fields.One2many(
+        'hr.payslip.compute.chunk', 'run_id', string='Compute Chunks', readonly=True)
+    compute_state = fields.Selection([
+        ('running', 'Computing'),
+        ('done', 'Computed'),
+        ('failed', 'Failed'),
+    ], string='Parallel Compute', compute='_compute_compute_progress')
+    compute_progress = fields.Float(string='Compute Progress', compute='_compute_compute_progress')
+
+    @api.depends('compute_chunk_ids.state', 'compute_chunk_ids.done_count', 'compute_chunk_ids.slip_count')
+    def _compute_compute_progress(self):
+        for run in self:
+            chunks = run.compute_chunk_ids
+            total = sum(chunks.mapped('slip_count'))
+            run.compute_progress = 100.0 * sum(chunks.mapped('done_count')) / total if total else 0.0
+            if not chunks:
+                run.compute_state = False
+            elif any(c.state == 'failed' for c in chunks):
+                run.compute_state = 'failed'
+            elif all(c.state == 'done' for c in chunks):
+                run.compute_state = 'done'
+            else:
+                run.compute_state = 'running'
+
+    def _get_compute_shards(self):
+        """Number of chunks a batch is split into: ``payroll.compute_shards``,
+        by default one per active compute worker cron."""
+        shards = int(self.env['ir.config_parameter'].sudo().get_param('payroll.compute_shards', 0))
+        if shards <= 0:
+            shards = len(self.env['hr.payslip.compute.chunk']._get_workers())
+        return max(1, shards)
+
+    def action_compute_parallel(self):
+        """Shard the draft payslips of the batch by employee and queue one
+        chunk per shard; each chunk is computed by a compute worker cron in
+        its own process and transaction."""
+        Chunk = self.env['hr.payslip.compute.chunk']
+        shards = self._get_compute_shards()
+        for run in self:
+            if run.compute_state == 'running':
+                raise UserError(_(
+                    "Payslips of %s are already being computed. If a worker was stopped, "
+                    "use Reset Parallel Compute first.", run.name))
+            slips = run.slip_ids.filtered(lambda s: s.state in ('draft', 'verify'))
+            if not slips:
+                raise UserError(_("There is no draft payslip to compute in %s.", run.name))
+
+            # all slips of an employee go to the same chunk
+            employee_ids = sorted(set(slips.employee_id.ids))
+            run.compute_chunk_ids.unlink()
+            vals_list = []
+            for shard in range(min(shards, len(employee_ids))):
+                shard_employees = set(employee_ids[shard::shards])
+                shard_slips = slips.filtered(lambda s: s.employee_id.id in shard_employees)
+                vals_list.append({
+                    'run_id': run.id,
+                    'slip_ids': [(6, 0, shard_slips.ids)],
+                    'slip_count': len(shard_slips),
+                })
+            Chunk.create(vals_list)
+        Chunk._trigger_workers()
+        return True
+
+    def action_reset_compute(self):
+        """Drop the compute chunks of the batch, e.g. when a worker was killed
+        mid-chunk. Slips already computed keep their lines; a chunk still
+        being computed stops after its current sub-batch."""
+        self.compute_chunk_ids.unlink()
+        return True
+
+    def action_recompute_stale(self):
+        slips = self.slip_ids.filtered('is_stale')
+        if slips:
+            slips.action_recompute_stale()
+        return True
+
+
+class HrPayslipComputeChunk(models.Model):
+    _name = 'hr.payslip.compute.chunk'
+    _description = 'Payslip Batch Compute Chunk'
+    _order = 'id'
+
+    run_id = fields.Many2one('hr.payslip.run', required=True, ondelete='cascade', index=True)
+    slip_ids = fields.Many2many('hr.payslip', string='Payslips')
+    slip_count = fields.Integer(string='Payslips')
+    done_count = fields.Integer(string='Computed')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='queued', required=True, index=True)
+    date_start = fields.Datetime()
+    date_end = fields.Datetime()
+    error_message = fields.Text()
+
+    @api.model
+    def _get_workers(self):
+        return self.env['ir.cron'].sudo().search([
+            ('model_id.model', '=', self._name),
+            ('code', '=', COMPUTE_WORKER_CODE),
+        ])
+
+    @api.model
+    def _trigger_workers(self):
+        for cron in self._get_workers():
+            cron._trigger()
+
+    @api.model
+    def _cron_compute_chunks(self):
+        """Compute queued chunks until none is left. Every worker cron runs
+        this; chunks are claimed with SKIP LOCKED, so each is computed once."""
+        while True:
+            chunk = self._claim_chunk()
+            if not chunk:
+                break
+            chunk._compute_slips()
+
+    @api.model
+    def _claim_chunk(self):
+        """Claim the oldest queued chunk, or a running chunk whose worker
+        made no progress for ``payroll.compute_chunk_timeout`` minutes (30),
+        e.g. killed by ``limit_time_real_cron``. Progress commits bump
+        write_date, which is the chunk heartbeat."""
+        timeout = int(self.env['ir.config_parameter'].sudo().get_param('payroll.compute_chunk_timeout', 30))
+        self.env.cr.execute("""
+            UPDATE hr_payslip_compute_chunk
+               SET state = 'running',
+                   date_start = now() AT TIME ZONE 'UTC',
+                   write_date = now() AT TIME ZONE 'UTC'
+             WHERE id = (
+                    SELECT id FROM hr_payslip_compute_chunk
+                     WHERE state = 'queued'
+                        OR (state = 'running'
+                            AND write_date < now() AT TIME ZONE 'UTC' - make_interval(mins => %s))
+                  ORDER BY id
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                   )
+         RETURNING id
+        """, (timeout,))
+        row = self.env.cr.fetchone()
+        self.env.cr.commit()
+        self.invalidate_model()
+        return self.browse(row[0]) if row else self.browse()
+
+    def _compute_slips(self):
+        """Compute the slips of the chunk in committed sub-batches of
+        ``payroll.compute_batch_size`` (50), so the batch progress moves while
+        the chunk runs and a failure keeps the slips already computed."""
+        self.ensure_one()
+        batch_size = int(self.env['ir.config_parameter'].sudo().get_param('payroll.compute_batch_size', 50))
+        slips = self.slip_ids.filtered(lambda s: s.state in ('draft', 'verify'))
+        try:
+            for start in range(0, len(slips), batch_size):
+                slips[start:start + batch_size].compute_sheet()
+                if not self.exists():
+                    # the batch compute was reset meanwhile
+                    self.env.cr.rollback()
+                    return
+                self.done_count = min(start + batch_size, len(slips))
+                self.env.cr.commit()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Payslip compute chunk %s failed", self.id)
+            self.write({
+                'state': 'failed',
+                'date_end': fields.Datetime.now(),
+                'error_message': str(e),
+            })
+            self.env.cr.commit()
+            return
+        self.write({
+            'state': 'done',
+            'done_count': self.slip_count,
+            'date_end': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
@@ -1,6 +1,14 @@
 # models/hr_working_schedule.py
 from odoo import api, fields, models
 
+EMPLOYEE_GROUP_RULES = [
+    ('group_1', 'Group 1 - Mon-Sat | 1 CL | 12 Holidays | Extra = LOP'),
+    ('group_2', 'Group 2 - Mon-Sat | 1 CL | 12 Holidays | Sunday Work = No LOP | 7-Day = Double Pay'),
+    ('group_3', 'Group 3 - Mon-Sat | No CL | 12 Holidays | Sunday Work = No LOP | 7-Day = Double Pay'),
+    ('group_4', 'Group 4 - All Days Working | Any Leave = LOP | No Festival Holidays'),
+    ('group_5', 'Group 5 - Mon-Sat | No CL | 12 Holidays | Extra = LOP'),
+]
+
 
 class ResourceCalendar(models.Model):
     """
@@ -10,13 +18,7 @@ class ResourceCalendar(models.Model):
     _inherit = 'resource.calendar'
 
     employee_group_rule = fields.Selection(
-        selection=[
-            ('group_1', 'Group 1 - Mon-Sat | 1 CL | 12 Holidays | Extra = LOP'),
-            ('group_2', 'Group 2 - Mon-Sat | 1 CL | 12 Holidays | Sunday Work = No LOP | 7-Day = Double Pay'),
-            ('group_3', 'Group 3 - Mon-Sat | No CL | 12 Holidays | Sunday Work = No LOP | 7-Day = Double Pay'),
-            ('group_4', 'Group 4 - All Days Working | Any Leave = LOP | No Festival Holidays'),
-            ('group_5', 'Group 5 - Mon-Sat | No CL | 12 Holidays | Extra = LOP'),
-        ],
+        selection=EMPLOYEE_GROUP_RULES,
         string='Employee Group Rule',
         help=(
             "Defines LOP and overtime rules for employees on this working schedule.\n\n"
@@ -28,6 +30,8 @@ class ResourceCalendar(models.Model):
             "Group 3: Same as Group 2 but NO casual leave allowance.\n\n"
             "Group 4: All 7 days are working days. Any absence = LOP. "
             "Yearly festival holidays are NOT applicable.\n\n"
-            "Group 5: Same as Group 1 but NO casual leave allowance."
+            "Group 5: Same as Group 1 but NO casual leave allowance.\n\n"
+            "Thresholds, leave credits and PF/ESI rates of each group are set "
+            "in Payroll > Configuration > Group Policies."
         )
     )
@@ -0,0 +1,158 @@
+# models/payroll_group_policy.py
+from collections import namedtuple
+
+from odoo import api, fields, models, tools
+
+from .hr_working_schedule import EMPLOYEE_GROUP_RULES
+
+# fields changing the payslip computation; editing others (name) keeps
+# computed payslips valid
+POLICY_RULE_FIELDS = (
+    'group_rule', 'all_days_working', 'festival_exempt', 'full_day_hours', 'half_day_hours',
+    'casual_leave_days', 'paid_leave_credit_days', 'ot_compensation',
+    'pf_base_rate', 'pf_rate', 'esi_rate',
+)
+
+
+class CompiledGroupPolicy(namedtuple('CompiledGroupPolicy', [
+    'all_days_working', 'festival_exempt', 'full_day_hours', 'half_day_hours',
+    'casual_leave_days', 'paid_leave_credit_days', 'ot_compensation',
+    'pf_base_rate', 'pf_rate', 'esi_rate',
+])):
+    """Immutable, query-free form of a payroll.group.policy used by the
+    payslip computation."""
+    __slots__ = ()
+
+    def day_fraction(self, hours):
+        """Worked fraction of a day: 1 from the full-day threshold, 0.5 from
+        the half-day threshold, else 0."""
+        if hours >= self.full_day_hours:
+            return 1.0
+        if hours >= self.half_day_hours:
+            return 0.5
+        return 0.0
+
+
+# schedules without a group rule (or whose policy was deleted):
+# Mon-Sat, festivals not exempt from attendance, no leave credit, no OT
+DEFAULT_POLICY = CompiledGroupPolicy(
+    all_days_working=False,
+    festival_exempt=False,
+    full_day_hours=6.0,
+    half_day_hours=3.0,
+    casual_leave_days=0.0,
+    paid_leave_credit_days=0.0,
+    ot_compensation=False,
+    pf_base_rate=0.70,
+    pf_rate=0.12,
+    esi_rate=0.0075,
+)
+
+
+class PayrollGroupPolicy(models.Model):
+    """
+    Payroll rules of an employee group (see resource.calendar
+    employee_group_rule): day thresholds, leave credits, Sunday/festival OT
+    and PF/ESI rates, editable without a code change.
+    """
+    _name = 'payroll.group.policy'
+    _description = 'Payroll Group Policy'
+    _order = 'group_rule'
+
+    name = fields.Char(required=True)
+    group_rule = fields.Selection(EMPLOYEE_GROUP_RULES, string='Employee Group', required=True)
+
+    all_days_working = fields.Boolean(
+        string='All Days Working',
+        help="All 7 days are working days: Sundays and festivals are neither paid nor "
+             "compensated, and any absence is LOP."
+    )
+    festival_exempt = fields.Boolean(
+        string='Festivals Auto-Paid',
+        default=True,
+        help="Festival days on working days are paid without attendance."
+    )
+    full_day_hours = fields.Float(string='Full Day From (Hours)', default=6.0)
+    half_day_hours = fields.Float(string='Half Day From (Hours)', default=3.0)
+
+    casual_leave_days = fields.Float(
+        string='Casual Leave / Month',
+        help="Absent days forgiven each month as casual leave."
+    )
+    paid_leave_credit_days = fields.Float(
+        string='Paid Leave Credit / Month',
+        help="Absent days forgiven each month as paid leave, before OT compensation."
+    )
+    ot_compensation = fields.Boolean(
+        string='Sunday / Festival OT',
+        help="Days worked on Sundays and festivals first offset LOP days; the rest is paid double."
+    )
+
+    pf_base_rate = fields.Float(string='PF Base (Share of Bank)', default=0.70, digits=(16, 4))
+    pf_rate = fields.Float(string='PF Rate', default=0.12, digits=(16, 4))
+    esi_rate = fields.Float(string='ESI Rate', default=0.0075, digits=(16, 4))
+
+    _group_rule_uniq = models.Constraint(
+        'UNIQUE(group_rule)',
+        "There is already a policy for this employee group.",
+    )
+
+    @api.model
+    @tools.ormcache()
+    def _get_compiled_policies(self):
+        """Return {group_rule: CompiledGroupPolicy}, read once and cached
+        until a policy changes."""
+        return {
+            rec.group_rule: CompiledGroupPolicy(
+                all_days_working=rec.all_days_working,
+                festival_exempt=rec.festival_exempt,
+                full_day_hours=rec.full_day_hours,
+                half_day_hours=rec.half_day_hours,
+                casual_leave_days=rec.casual_leave_days,
+                paid_leave_credit_days=rec.paid_leave_credit_days,
+                ot_compensation=rec.ot_compensation,
+                pf_base_rate=rec.pf_base_rate,
+                pf_rate=rec.pf_rate,
+                esi_rate=rec.esi_rate,
+            )
+            for rec in self.sudo().search([])
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        policies = super().create(vals_list)
+        self._policies_changed(set(policies.mapped('group_rule')))
+        return policies
+
+    def write(self, vals):
+        if not any(fname in vals for fname in POLICY_RULE_FIELDS):
+            return super().write(vals)
+        group_rules = set(self.mapped('group_rule'))
+        res = super().write(vals)
+        self._policies_changed(group_rules | set(self.mapped('group_rule')))
+        return res
+
+    def unlink(self):
+        group_rules = set(self.mapped('group_rule'))
+        res = super().unlink()
+        self._policies_changed(group_rules)
+        return res
+
+    def _policies_changed(self, group_rules):
+        """Reset the compiled policies and flag the draft payslips of the
+        employee groups ``group_rules`` as stale."""
+        self.env.registry.clear_cache()
+        if not group_rules:
+            return
+        Payslip = self.env['hr.payslip'].sudo()
+        slips = Payslip.search([
+            ('state', 'in', ('draft', 'verify')),
+            '|',
+            ('version_id.resource_calendar_id.employee_group_rule', 'in', list(group_rules)),
+            ('employee_id.resource_calendar_id.employee_group_rule', 'in', list(group_rules)),
+        ])
+        # same calendar as the payslip computation: the version's, else the employee's
+        slips = slips.filtered(lambda s: (
+            s.version_id.resource_calendar_id if s.version_id else s.employee_id.resource_calendar_id
+        ).employee_group_rule in group_rules)
+        slips._flag_stale()
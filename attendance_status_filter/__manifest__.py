@@ -5,7 +5,7 @@
     "category": "Human Resources",
     "author": "Custom",
     "license": "LGPL-3",
-    "depends": ["hr", "hr_attendance"],   
+    "depends": ["hr", "hr_attendance", "l4e_biotime_connector"],   
     
     "data": [
         "security/ir.model.access.csv",
@@ -1,6 +1,5 @@
 from odoo import models, fields
 from datetime import datetime, time, timedelta
-import pytz
 
  
 class AttendanceReportWizard(models.TransientModel):
@@ -20,39 +19,16 @@ class AttendanceReportWizard(models.TransientModel):
     def _prepare_report_data(self):
         records = []
 
-        user_tz = pytz.timezone(self.env.user.tz or "UTC")
-
-        # Convert Date → Datetime → UTC
-        date_from_dt = user_tz.localize(
-            datetime.combine(self.date_from, time.min)
-        ).astimezone(pytz.UTC)
-
-        date_to_dt = user_tz.localize(
-            datetime.combine(self.date_to, time.max)
-        ).astimezone(pytz.UTC)
-
         # Get ALL employees
         employees = self.env["hr.employee"].search([
             ("active", "=", True),
             ("user_id", "!=", self.env.ref("base.user_admin").id)
         ], order="name")
 
-        # Get attendance records in range
-        attendances = self.env["hr.attendance"].search([
-            ("check_in", ">=", date_from_dt),
-            ("check_in", "<=", date_to_dt),
-        ])
-
-        # Create attendance map (employee_id → attendance)
-        attendance_map = {}
-        for att in attendances:
-            emp_id = att.employee_id.id
-            check_date = fields.Datetime.context_timestamp(
-                self, att.check_in
-            ).date()
-
-            attendance_map.setdefault(emp_id, {})
-            attendance_map[emp_id][check_date] = att
+        # First check-in / last check-out per employee and local day (one SQL aggregate)
+        attendance_map = self.env["hr.attendance"]._get_daily_totals(
+            employees.ids, self.date_from, self.date_to
+        )
 
         # Loop all employees
         current_date = self.date_from
@@ -63,16 +39,16 @@ class AttendanceReportWizard(models.TransientModel):
                 att = attendance_map.get(emp.id, {}).get(current_date)
 
                 if att:
-                    status = self._compute_status(att)
+                    status = self._compute_status(att["check_in"], att["check_out"])
 
                     check_in_local = (
-                        fields.Datetime.context_timestamp(self, att.check_in)
-                        if att.check_in else None
+                        fields.Datetime.context_timestamp(self, att["check_in"])
+                        if att["check_in"] else None
                     )
 
                     check_out_local = (
-                        fields.Datetime.context_timestamp(self, att.check_out)
-                        if att.check_out else None
+                        fields.Datetime.context_timestamp(self, att["check_out"])
+                        if att["check_out"] else None
                     )
 
                     records.append({
@@ -105,15 +81,15 @@ class AttendanceReportWizard(models.TransientModel):
             "records": records,
         }
 
-    def _compute_status(self, att):
+    def _compute_status(self, check_in, check_out):
 
-        if not att.check_in and att.check_out:
+        if not check_in and check_out:
             return "Miss In (MI)"
 
-        if not att.check_in:
+        if not check_in:
             return "Absence (A)"
 
-        check_in_local = fields.Datetime.context_timestamp(self, att.check_in)
+        check_in_local = fields.Datetime.context_timestamp(self, check_in)
 
         if check_in_local.time() >= time(9, 36):
             return "Late (LT)"
@@ -1,7 +1,6 @@
 from odoo import models, fields
 from datetime import date, datetime, time
 import calendar
-import pytz
 
 
 class MonthlyAttendanceWizard(models.TransientModel):
@@ -56,28 +55,10 @@ class MonthlyAttendanceWizard(models.TransientModel):
             ("user_id", "!=", self.env.ref("base.user_admin").id)
         ], order="name")
 
-        tz = pytz.timezone(self.env.user.tz or "UTC")
-
-        start_month = tz.localize(datetime(year, month, 1)).astimezone(pytz.UTC)
-        end_month = tz.localize(
-            datetime(year, month, days_in_month, 23, 59, 59)
-        ).astimezone(pytz.UTC)
-
-        all_attendances = self.env["hr.attendance"].search([
-            ("check_in", ">=", start_month),
-            ("check_in", "<=", end_month),
-        ])
-
-        attendance_map = {}
-        for att in all_attendances:
-            emp_id = att.employee_id.id
-            check_date = fields.Datetime.context_timestamp(
-                self, att.check_in
-            ).date()
-
-            attendance_map.setdefault(emp_id, {})
-            if check_date not in attendance_map[emp_id]:
-                attendance_map[emp_id][check_date] = att
+        # First check-in / last check-out per employee and local day (one SQL aggregate)
+        attendance_map = self.env["hr.attendance"]._get_daily_totals(
+            employees.ids, date(year, month, 1), date(year, month, days_in_month)
+        )
 
         records = []
         sl_no = 1
@@ -110,10 +91,10 @@ class MonthlyAttendanceWizard(models.TransientModel):
         if not att:
             return "A"
 
-        if not att.check_in:
-            return "MI" if att.check_out else "A"
+        if not att["check_in"]:
+            return "MI" if att["check_out"] else "A"
 
-        check_in = fields.Datetime.context_timestamp(self, att.check_in)
+        check_in = fields.Datetime.context_timestamp(self, att["check_in"])
 
         if check_in.time() >= time(9, 36):
             return "LT"
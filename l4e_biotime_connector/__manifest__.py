@@ -1,19 +1,31 @@
 {
     "name": "Biotime Integration",
-    "version": "19.0.1.0",
+    "version": "19.0.1.9",
     "summary": "Biotime Biodata, Terminals and Attendance Sync",
     "category": "HR",
-    "depends": ["hr"],
+    "depends": ["hr", "hr_attendance"],
     "data": [
          "security/ir.model.access.csv", 
        
         "views/biotime_terminal_view.xml",
         "views/biotime_biodata_view.xml",
         "views/hr_attendance_line_view.xml",
+        "views/hr_attendance_line_archive_view.xml",
+        "views/hr_attendance_view.xml",
          "views/biotime_menu.xml",
-        "views/bio_time_service_views.xml"
+        "views/bio_time_service_views.xml",
+        "views/biotime_server_view.xml",
+        "views/biotime_backfill_view.xml",
+        "views/biotime_sync_run_view.xml",
+        "views/biotime_job_view.xml",
+        "data/ir_cron_data.xml",
 
     ], 
+    "assets": {
+        "web.assets_backend": [
+            "l4e_biotime_connector/static/src/fields/biotime_job_progress.js",
+        ],
+    },
     "installable": True,
     'application': True,
     'license': 'LGPL-3',
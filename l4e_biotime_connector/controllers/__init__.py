@@ -0,0 +1 @@
+from . import biotime_push
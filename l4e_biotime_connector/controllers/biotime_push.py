@@ -0,0 +1,72 @@
+import hmac
+import json
+import logging
+from datetime import datetime
+
+from odoo import http
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+
+class BiotimePushController(http.Controller):
+    """Receiver of transaction batches pushed by a BioTime server.
+
+    The body is JSON: a list of transactions, a single transaction, or a
+    REST-style page ``{"data": [...]}``; each transaction has at least the
+    ``id``, ``emp_code`` and ``punch_time`` of the transactions API. The
+    server's push secret is sent in the ``X-Biotime-Secret`` header; it is
+    never read from the URL, which ends up in proxy and access logs.
+    """
+
+    @http.route('/biotime/push/<int:server_id>', type='http', auth='public',
+                methods=['POST'], csrf=False, save_session=False)
+    def push_transactions(self, server_id, **kwargs):
+        server = request.env['biotime.server'].sudo().browse(server_id).exists()
+        if not server or not server.active or not server.push_secret:
+            return request.make_json_response({'error': "unknown server"}, status=404)
+
+        secret = request.httprequest.headers.get('X-Biotime-Secret') or ''
+        if not hmac.compare_digest(secret.encode(), server.push_secret.encode()):
+            _logger.warning(f"Rejected Biotime push for server {server.name}: bad secret")
+            return request.make_json_response({'error': "invalid secret"}, status=403)
+
+        try:
+            payload = json.loads(request.httprequest.get_data() or b"null")
+        except ValueError:
+            return request.make_json_response({'error': "invalid JSON"}, status=400)
+
+        if isinstance(payload, dict):
+            transactions = payload.get('data', [payload])
+        else:
+            transactions = payload
+        if not isinstance(transactions, list) or not all(isinstance(tx, dict) for tx in transactions):
+            return request.make_json_response({'error': "expected a list of transactions"}, status=400)
+
+        try:
+            transactions = [self._clean_transaction(tx) for tx in transactions]
+        except ValueError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+
+        imported = request.env['biotime.service'].sudo()._ingest_push(server, transactions)
+        return request.make_json_response({
+            'received': len(transactions),
+            'imported': imported,
+        })
+
+    def _clean_transaction(self, tx):
+        """Return ``tx`` with an int ``id`` (numeric strings are accepted)
+        and a ``punch_time`` in the ``YYYY-MM-DD HH:MM:SS`` format of the
+        transactions API; raise ValueError otherwise."""
+        tx_id = tx.get('id')
+        if isinstance(tx_id, str) and tx_id.strip().isdigit():
+            tx_id = int(tx_id)
+        if not isinstance(tx_id, int) or isinstance(tx_id, bool) or tx_id <= 0:
+            raise ValueError(f"invalid transaction id: {tx.get('id')!r}")
+
+        punch_time = tx.get('punch_time')
+        try:
+            datetime.strptime(punch_time, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid punch_time of transaction {tx_id}: {punch_time!r}") from None
+        return dict(tx, id=tx_id)
@@ -0,0 +1,15 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Drop duplicate punch lines so the unique constraint on
+    biotime_transaction_id can be created; the oldest line is kept."""
+    cr.execute("""
+        DELETE FROM hr_attendance_line l
+         USING hr_attendance_line keep
+         WHERE l.biotime_transaction_id = keep.biotime_transaction_id
+           AND l.id > keep.id
+    """)
+    _logger.info("Removed %s duplicate Biotime punch line(s)", cr.rowcount)
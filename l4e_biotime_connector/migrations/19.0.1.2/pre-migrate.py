@@ -0,0 +1,29 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Create and fill the stored local_date columns in SQL, so the ORM does
+    not recompute them record by record on large punch tables."""
+    cr.execute("""
+        SELECT value FROM ir_config_parameter WHERE key = 'biotime.timezone'
+    """)
+    row = cr.fetchone()
+    tz = (row and row[0]) or "Asia/Kolkata"
+
+    cr.execute("ALTER TABLE hr_attendance_line ADD COLUMN IF NOT EXISTS local_date date")
+    cr.execute("""
+        UPDATE hr_attendance_line
+           SET local_date = (punch_time AT TIME ZONE 'UTC' AT TIME ZONE %s)::date
+         WHERE local_date IS NULL
+    """, (tz,))
+    _logger.info("Filled local_date on %s Biotime punch line(s)", cr.rowcount)
+
+    cr.execute("ALTER TABLE hr_attendance ADD COLUMN IF NOT EXISTS local_date date")
+    cr.execute("""
+        UPDATE hr_attendance
+           SET local_date = (check_in AT TIME ZONE 'UTC' AT TIME ZONE %s)::date
+         WHERE local_date IS NULL
+    """, (tz,))
+    _logger.info("Filled local_date on %s attendance(s)", cr.rowcount)
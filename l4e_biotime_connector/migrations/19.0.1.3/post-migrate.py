@@ -0,0 +1,50 @@
+import logging
+from urllib.parse import urlparse
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Turn the single ir.config_parameter configuration into a
+    biotime.server record and tag existing data with it."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    ICP = env['ir.config_parameter']
+
+    base_url = ICP.get_param('biotime.base_url')
+    if not base_url or env['biotime.server'].with_context(active_test=False).search_count([]):
+        return
+
+    netloc = urlparse(base_url).netloc
+    server = env['biotime.server'].create({
+        'name': netloc or base_url,
+        'base_url': base_url,
+        'username': ICP.get_param('biotime.username') or '',
+        'password': ICP.get_param('biotime.password') or '',
+        'tz': ICP.get_param('biotime.timezone') or "Asia/Kolkata",
+        'last_transaction_id': int(ICP.get_param(f"biotime.cursor.{netloc}.last_transaction_id") or 0),
+        'last_punch_time': ICP.get_param(f"biotime.cursor.{netloc}.last_punch_time") or False,
+    })
+    env.flush_all()
+
+    for table in ('hr_attendance_line', 'biotime_terminal', 'biotime_biodata'):
+        cr.execute(
+            f"UPDATE {table} SET server_id = %s WHERE server_id IS NULL",
+            (server.id,)
+        )
+        _logger.info("Linked %s %s row(s) to Biotime server %s", cr.rowcount, table, server.name)
+
+    cr.execute("""
+        UPDATE hr_attendance a
+           SET biotime_server_id = %s
+         WHERE a.biotime_server_id IS NULL
+           AND EXISTS (SELECT 1 FROM hr_attendance_line l WHERE l.attendance_id = a.id)
+    """, (server.id,))
+    cr.execute("UPDATE biotime_backfill SET server_id = %s WHERE server_id IS NULL", (server.id,))
+
+    cr.execute("""
+        DELETE FROM ir_config_parameter
+         WHERE key IN ('biotime.base_url', 'biotime.username', 'biotime.password')
+            OR key LIKE 'biotime.cursor.%%'
+    """)
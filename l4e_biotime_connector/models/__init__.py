@@ -1,6 +1,12 @@
+from . import biotime_server
 from . import biotime_service
 from . import biotime_terminal
 from . import biotime_biodata
 from . import hr_employee
 from . import hr_attendance
 from . import hr_attendance_line
+from . import hr_attendance_line_archive
+from . import biotime_backfill
+from . import biotime_sync_run
+from . import biotime_job
+from . import biotime_page_cache
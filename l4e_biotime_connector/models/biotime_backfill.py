@@ -0,0 +1,172 @@
+import logging
+from datetime import datetime, timedelta, time
+from urllib.parse import urlencode
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class BiotimeBackfill(models.Model):
+    _name = "biotime.backfill"
+    _description = "Biotime Historical Backfill"
+    _order = "id desc"
+
+    name = fields.Char(compute="_compute_name", store=True)
+    server_id = fields.Many2one(
+        "biotime.server",
+        required=True,
+        ondelete="cascade",
+        default=lambda self: self.env['biotime.server'].search([], limit=1)
+    )
+    date_from = fields.Date(required=True)
+    date_to = fields.Date(required=True)
+    chunk = fields.Selection([
+        ('day', 'Day'),
+        ('week', 'Week'),
+    ], default='day', required=True)
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='draft', readonly=True, copy=False)
+
+    # progress: first day not yet imported
+    next_date = fields.Date(readonly=True, copy=False)
+    chunks_done = fields.Integer(readonly=True, copy=False)
+    chunks_total = fields.Integer(compute="_compute_chunks_total")
+    lines_imported = fields.Integer(readonly=True, copy=False)
+    last_error = fields.Text(readonly=True, copy=False)
+
+    @api.depends('server_id.name', 'date_from', 'date_to')
+    def _compute_name(self):
+        for rec in self:
+            rec.name = f"Backfill {rec.server_id.name or ''} {rec.date_from} → {rec.date_to}"
+
+    @api.depends('date_from', 'date_to', 'chunk')
+    def _compute_chunks_total(self):
+        for rec in self:
+            if not rec.date_from or not rec.date_to or rec.date_to < rec.date_from:
+                rec.chunks_total = 0
+                continue
+            days = (rec.date_to - rec.date_from).days + 1
+            step = rec._chunk_days()
+            rec.chunks_total = -(-days // step)
+
+    def _chunk_days(self):
+        return 7 if self.chunk == 'week' else 1
+
+    # ------------------------------------------------
+    # ACTIONS
+    # ------------------------------------------------
+
+    def action_start(self):
+        """Queue the backfill as a biotime.job; the job worker imports it."""
+        jobs = self.env['biotime.job']
+        for rec in self:
+            if rec.date_to < rec.date_from:
+                raise UserError("The end date must be after the start date.")
+            rec.write({
+                'state': 'running',
+                'next_date': rec.next_date or rec.date_from,
+                'last_error': False,
+            })
+            jobs |= jobs._enqueue('backfill', backfill=rec)
+        return jobs._action_open()
+
+    def action_reset(self):
+        self.write({
+            'state': 'draft',
+            'next_date': False,
+            'chunks_done': 0,
+            'lines_imported': 0,
+            'last_error': False,
+        })
+        return True
+
+    @api.model
+    def cron_resume_backfills(self):
+        """Continue every backfill left running by an interrupted worker."""
+        self.search([('state', '=', 'running')])._run_chunks()
+
+    # ------------------------------------------------
+    # CHUNK LOOP
+    # ------------------------------------------------
+
+    def _lock_for_chunk(self):
+        """Lock the backfill row for the current chunk, or return False when
+        another worker is already processing it."""
+        self.env.cr.execute(
+            "SELECT id FROM biotime_backfill WHERE id = %s FOR UPDATE SKIP LOCKED",
+            (self.id,)
+        )
+        return bool(self.env.cr.fetchone())
+
+    def _run_chunks(self):
+        Service = self.env['biotime.service']
+
+        for rec in self:
+            server = rec.server_id.sudo()
+            base_url = server.base_url.rstrip("/")
+            while True:
+                if not rec._lock_for_chunk():
+                    _logger.info(f"Backfill {rec.id} is processed by another worker")
+                    break
+
+                # progress may have moved while waiting for the lock
+                rec.invalidate_recordset()
+                if rec.state != 'running' or not rec.next_date:
+                    break
+                if rec.next_date > rec.date_to:
+                    rec.state = 'done'
+                    self.env.cr.commit()
+                    break
+
+                chunk_start = rec.next_date
+                chunk_end = min(
+                    chunk_start + timedelta(days=rec._chunk_days() - 1),
+                    rec.date_to,
+                )
+                query = urlencode({
+                    'ordering': 'id',
+                    'start_time': datetime.combine(chunk_start, time(0, 0, 0)).strftime("%Y-%m-%d %H:%M:%S"),
+                    'end_time': datetime.combine(chunk_end, time(23, 59, 59)).strftime("%Y-%m-%d %H:%M:%S"),
+                })
+                url = f"{base_url}/iclock/api/transactions/?{query}"
+
+                _logger.info(f"Backfill {rec.id}: importing {chunk_start} → {chunk_end}")
+                try:
+                    pages = Service._safe_paginated_get_line_new(
+                        url, server.username, server.password,
+                        start_page=1,
+                        max_pages=10000,
+                        parallel=True,
+                    )
+                    imported = Service._ingest_pages(
+                        (payload.get("data", []) for payload in pages),
+                        server,
+                    )
+                except Exception as e:
+                    self.env.cr.rollback()
+                    _logger.exception(f"Backfill {rec.id} failed on {chunk_start}")
+                    rec.write({
+                        'state': 'failed',
+                        'last_error': f"{chunk_start} → {chunk_end}: {e}",
+                    })
+                    self.env.cr.commit()
+                    break
+
+                rec.write({
+                    'next_date': chunk_end + timedelta(days=1),
+                    'chunks_done': rec.chunks_done + 1,
+                    'lines_imported': rec.lines_imported + imported,
+                })
+                # one transaction per chunk: a crash only loses the current chunk
+                self.env.cr.commit()
+                Service._job_progress(
+                    rec.chunks_done, rec.chunks_total,
+                    f"Imported up to {chunk_end}"
+                )
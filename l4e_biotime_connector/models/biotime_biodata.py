@@ -4,7 +4,14 @@ class BiotimeBiodata(models.Model):
     _name = "biotime.biodata"
     _description = "Biotime Biodata"
 
+    server_id = fields.Many2one(
+        "biotime.server",
+        ondelete="cascade",
+        index=True
+    )
     biotime_id = fields.Integer(index=True)
+    # hash of the last imported API payload, to skip unchanged rows
+    payload_hash = fields.Char(copy=False)
     employee_name = fields.Char()
     emp_code = fields.Char(index=True)
     bio_type = fields.Integer()
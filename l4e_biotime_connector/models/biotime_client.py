@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import urlencode, urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+# One keep-alive session per (server, user, pool size), shared by every
+# sync running in this worker process.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _get_session(base_url, username, password, pool_size, retries, backoff):
+    key = (base_url, username, pool_size, retries, backoff)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None or session.auth != (username, password):
+            session = requests.Session()
+            session.auth = (username, password)
+            retry = Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=retry,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[key] = session
+        return session
+
+
+class BiotimeClient:
+    """Thin HTTP layer over the BioTime REST API.
+
+    Requests go through a pooled keep-alive ``requests.Session`` with
+    retry/backoff, and :meth:`fetch_pages` can download known page numbers
+    in parallel with a bounded thread pool.
+
+    When ``stats`` (a ``collections.Counter``) is given, every request adds
+    to its ``pages_fetched`` and ``http_time`` counters.
+    """
+
+    def __init__(self, base_url, username, password, pool_size=8,
+                 max_workers=4, retries=3, backoff=0.5, timeout=60, stats=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.stats = stats
+        self._stats_lock = threading.Lock()
+        self.session = _get_session(
+            self.base_url, username, password, pool_size, retries, backoff
+        )
+
+    def absolute(self, url):
+        """BioTime sometimes returns relative ``next`` links."""
+        if url and url.startswith("/"):
+            return self.base_url + url
+        return url
+
+    def get_json(self, url, timeout=None):
+        start = perf_counter()
+        try:
+            res = self.session.get(self.absolute(url), timeout=timeout or self.timeout)
+            res.raise_for_status()
+            return res.json()
+        finally:
+            if self.stats is not None:
+                with self._stats_lock:
+                    self.stats['pages_fetched'] += 1
+                    self.stats['http_time'] += perf_counter() - start
+
+    def get_json_cached(self, url, entry=None, timeout=None):
+        """Conditional GET of ``url``.
+
+        ``entry`` is the cache entry returned by the previous call for this
+        url (``etag``, ``last_modified``, ``hash``, ``next``, ``count``).
+        Its validators are sent as ``If-None-Match`` / ``If-Modified-Since``;
+        a 304 answer, or a body hashing like the cached one, is reported
+        unchanged without being parsed. Returns ``(payload, entry)`` where
+        ``payload`` is None when unchanged and ``entry`` is the new entry.
+        """
+        entry = dict(entry or {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        start = perf_counter()
+        try:
+            res = self.session.get(
+                self.absolute(url), headers=headers, timeout=timeout or self.timeout
+            )
+            if res.status_code == 304:
+                return None, entry
+            res.raise_for_status()
+            body = res.content
+        finally:
+            if self.stats is not None:
+                with self._stats_lock:
+                    self.stats['pages_fetched'] += 1
+                    self.stats['http_time'] += perf_counter() - start
+
+        entry['etag'] = res.headers.get('ETag')
+        entry['last_modified'] = res.headers.get('Last-Modified')
+        body_hash = hashlib.sha1(body).hexdigest()
+        if body_hash == entry.get('hash'):
+            return None, entry
+
+        payload = res.json()
+        entry.update(
+            hash=body_hash,
+            next=self.absolute(payload.get("next")),
+            count=payload.get("count"),
+        )
+        return payload, entry
+
+    def iter_pages_cached(self, start_url, max_pages, cache):
+        """Follow ``next`` links like :meth:`iter_pages`, with conditional
+        requests. ``cache`` maps urls to entries of :meth:`get_json_cached`
+        and is updated in place. Yields ``(url, payload)``, ``payload``
+        being None for an unchanged page; its ``next`` link comes from the
+        cache.
+        """
+        url = self.absolute(start_url)
+        seen_urls = set()
+        while url and url not in seen_urls and len(seen_urls) < max_pages:
+            seen_urls.add(url)
+            payload, cache[url] = self.get_json_cached(url, cache.get(url))
+            yield url, payload
+            url = cache[url].get('next')
+
+    def page_url(self, url, page):
+        parsed = urlparse(self.absolute(url))
+        query = parse_qs(parsed.query)
+        query["page"] = [str(page)]
+        return parsed._replace(query=urlencode(query, doseq=True)).geturl()
+
+    def iter_pages(self, start_url, max_pages):
+        """Follow ``next`` links one page at a time."""
+        url = self.absolute(start_url)
+        seen_urls = set()
+        while url and url not in seen_urls and len(seen_urls) < max_pages:
+            seen_urls.add(url)
+            payload = self.get_json(url)
+            yield payload
+            url = self.absolute(payload.get("next"))
+
+    def fetch_pages(self, start_url, max_pages, start_page=1):
+        """Yield up to ``max_pages`` pages, in page order, from ``start_page``.
+
+        The first page tells the total ``count`` and the page size, the
+        remaining page numbers are then downloaded concurrently. A failing
+        page raises when it is reached, after every earlier page was yielded.
+        """
+        first = self.get_json(self.page_url(start_url, start_page))
+        yield first
+
+        page_size = len(first.get("data") or [])
+        if not first.get("next") or not page_size:
+            return
+
+        total_pages = math.ceil((first.get("count") or 0) / page_size)
+        last_page = min(total_pages, start_page + max_pages - 1)
+        if last_page <= start_page:
+            return
+
+        urls = [
+            self.page_url(start_url, page)
+            for page in range(start_page + 1, last_page + 1)
+        ]
+        _logger.info(
+            "Fetching BioTime pages %s-%s with %s workers",
+            start_page + 1, last_page, self.max_workers
+        )
+        # submit a bounded window at a time so at most a few pages wait in memory
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for i in range(0, len(urls), window):
+                yield from executor.map(self.get_json, urls[i:i + window])
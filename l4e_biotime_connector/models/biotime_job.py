@@ -0,0 +1,269 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import models, fields, api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# job type → (biotime.sync.run type, biotime.service method)
+JOB_METHODS = {
+    'attendance': ('attendance', '_sync_attendance'),
+    'terminals': ('terminals', '_sync_terminals'),
+    'biodata': ('biodata', '_sync_biodata'),
+    'auto_close': ('auto_close', '_auto_close_at_nine_pm'),
+}
+
+
+class BiotimeJobCancelled(Exception):
+    """Raised inside a running job once its cancellation was requested."""
+
+
+class BiotimeJob(models.Model):
+    _name = "biotime.job"
+    _description = "Biotime Sync Job"
+    _order = "id desc"
+
+    name = fields.Char(compute="_compute_name", store=True)
+    job_type = fields.Selection([
+        ('attendance', 'Attendance'),
+        ('terminals', 'Terminals'),
+        ('biodata', 'Biodata'),
+        ('auto_close', 'Auto Close'),
+        ('backfill', 'Backfill'),
+    ], required=True, readonly=True)
+    server_id = fields.Many2one("biotime.server", ondelete="cascade", readonly=True)
+    backfill_id = fields.Many2one("biotime.backfill", ondelete="cascade", readonly=True)
+    user_id = fields.Many2one("res.users", default=lambda self: self.env.user, readonly=True)
+
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], default='queued', required=True, readonly=True, index=True)
+    progress = fields.Float(readonly=True)
+    progress_message = fields.Char(readonly=True)
+    cancel_requested = fields.Boolean(readonly=True, copy=False)
+
+    date_start = fields.Datetime(readonly=True)
+    # last sign of life of the worker: claim or progress report
+    date_heartbeat = fields.Datetime(readonly=True)
+    date_end = fields.Datetime(readonly=True)
+    error_message = fields.Text(readonly=True)
+
+    @api.depends('job_type', 'server_id.name', 'backfill_id.name')
+    def _compute_name(self):
+        labels = dict(self._fields['job_type'].selection)
+        for rec in self:
+            target = rec.backfill_id.name or rec.server_id.name
+            rec.name = f"{labels.get(rec.job_type)} ({target})" if target else labels.get(rec.job_type)
+
+    # ------------------------------------------------
+    # QUEUE
+    # ------------------------------------------------
+
+    @api.model
+    def _enqueue(self, job_type, servers=None, backfill=None):
+        """Queue ``job_type``: one job per server (all active ones by
+        default), one job for auto close, or one job for ``backfill``.
+
+        A target that already has a queued or running job of this type is
+        not queued twice. Returns the jobs of every target; a stale running
+        job returned is picked up again by the worker (see
+        :meth:`_claim_jobs`).
+        """
+        if backfill:
+            targets = [{'backfill_id': backfill.id}]
+        elif job_type == 'auto_close':
+            targets = [{}]
+        else:
+            servers = servers or self.env['biotime.service']._get_servers()
+            targets = [{'server_id': server.id} for server in servers]
+
+        pending = self.search([
+            ('job_type', '=', job_type),
+            ('state', 'in', ('queued', 'running')),
+        ])
+        jobs = self.browse()
+        to_create = []
+        for target in targets:
+            job = pending.filtered(
+                lambda j: j.server_id.id == target.get('server_id', False)
+                and j.backfill_id.id == target.get('backfill_id', False)
+            )[:1]
+            if job:
+                jobs |= job
+            else:
+                to_create.append(dict(target, job_type=job_type))
+
+        if to_create:
+            jobs |= self.create(to_create)
+        if to_create or jobs._filter_stale():
+            self.env.ref('l4e_biotime_connector.ir_cron_biotime_jobs')._trigger()
+        return jobs
+
+    @api.model
+    def _get_stale_minutes(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('biotime.job_timeout_minutes', 60))
+
+    def _filter_stale(self):
+        """Running jobs whose worker gave no sign of life for
+        ``biotime.job_timeout_minutes`` (60): killed by a timeout or a
+        restart."""
+        cutoff = fields.Datetime.now() - timedelta(minutes=self._get_stale_minutes())
+        return self.filtered(
+            lambda j: j.state == 'running' and (j.date_heartbeat or j.date_start or cutoff) < cutoff
+        )
+
+    def _action_open(self):
+        action = self.env['ir.actions.act_window']._for_xml_id(
+            'l4e_biotime_connector.action_biotime_job'
+        )
+        if len(self) == 1:
+            action.update(res_id=self.id, view_mode='form', views=[(False, 'form')])
+        else:
+            action['domain'] = [('id', 'in', self.ids)]
+        return action
+
+    def action_cancel(self):
+        # a stale running job has no worker left to read cancel_requested
+        (self.filtered(lambda j: j.state == 'queued') | self._filter_stale()).write({
+            'state': 'cancelled',
+            'date_end': fields.Datetime.now(),
+        })
+        # a running job stops at its next progress report
+        self.filtered(lambda j: j.state == 'running').write({'cancel_requested': True})
+        return True
+
+    # ------------------------------------------------
+    # WORKER
+    # ------------------------------------------------
+
+    @api.model
+    def cron_run_jobs(self):
+        """Drain the queue. Queued jobs are claimed in batches of
+        ``biotime.server_workers`` (4) and run in parallel, each in its own
+        thread and transaction."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_workers = max(1, int(ICP.get_param('biotime.server_workers', 4)))
+
+        while True:
+            job_ids = self._claim_jobs(max_workers)
+            if not job_ids:
+                break
+            with ThreadPoolExecutor(max_workers=len(job_ids)) as executor:
+                # each job records its own failure, nothing to collect here
+                list(executor.map(self._run_job_thread, job_ids))
+
+    @api.model
+    def _claim_jobs(self, limit):
+        """Mark up to ``limit`` queued jobs as running and commit, so two
+        workers never pick the same job.
+
+        Stale running jobs (no heartbeat for ``biotime.job_timeout_minutes``)
+        are claimed again, or cancelled if their cancellation was requested.
+        A job reclaimed while its old worker is in fact still alive is safe:
+        syncs hold a run mutex and backfills lock their row per chunk.
+        """
+        stale = "state = 'running' AND COALESCE(date_heartbeat, date_start) < now() AT TIME ZONE 'UTC' - %(timeout)s"
+        params = {'limit': limit, 'timeout': timedelta(minutes=self._get_stale_minutes())}
+        self.env.cr.execute(f"""
+            UPDATE biotime_job
+               SET state = 'cancelled', date_end = now() AT TIME ZONE 'UTC'
+             WHERE {stale} AND cancel_requested
+        """, params)
+        self.env.cr.execute(f"""
+            UPDATE biotime_job
+               SET state = 'running',
+                   date_start = now() AT TIME ZONE 'UTC',
+                   date_heartbeat = now() AT TIME ZONE 'UTC'
+             WHERE id IN (
+                    SELECT id FROM biotime_job
+                     WHERE state = 'queued' OR ({stale})
+                  ORDER BY id
+                     LIMIT %(limit)s
+                       FOR UPDATE SKIP LOCKED
+                   )
+         RETURNING id
+        """, params)
+        job_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.commit()
+        self.invalidate_model()
+        return job_ids
+
+    def _run_job_thread(self, job_id):
+        """Run one job in its own cursor, then store its outcome.
+
+        The job transaction never writes the job row: _report_progress
+        updates it from side transactions, so a write from the job
+        transaction would fail to serialize and roll the sync back. The
+        outcome is written once the job transaction is over, also when it
+        failed to commit, so a job never stays 'running'.
+        """
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, {})
+                vals = env['biotime.job'].browse(job_id)._run()
+        except Exception as e:
+            _logger.exception(f"Biotime job {job_id} failed")
+            vals = {'state': 'failed', 'error_message': str(e)}
+        self._write_outcome(job_id, vals)
+
+    def _run(self):
+        """Run the job and return the values of its outcome (see
+        :meth:`_write_outcome`)."""
+        self.ensure_one()
+        Service = self.env['biotime.service'].with_context(biotime_job_id=self.id)
+        try:
+            if self.job_type == 'backfill':
+                self.backfill_id.with_context(biotime_job_id=self.id)._run_chunks()
+            else:
+                sync_type, method_name = JOB_METHODS[self.job_type]
+                Service._run_tracked(sync_type, method_name, self.server_id or None)
+        except BiotimeJobCancelled:
+            self.env.cr.rollback()
+            _logger.info(f"Biotime job {self.id} cancelled")
+            if self.backfill_id.state == 'running':
+                # keep the progress, the backfill can be resumed later
+                self.backfill_id.write({'state': 'failed', 'last_error': "Cancelled"})
+            return {'state': 'cancelled'}
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception(f"Biotime job {self.id} failed")
+            return {'state': 'failed', 'error_message': str(e)}
+
+        # _run_chunks records a failed chunk on the backfill and returns
+        if self.backfill_id:
+            self.backfill_id.invalidate_recordset(['state', 'last_error'])
+            if self.backfill_id.state == 'failed':
+                return {'state': 'failed', 'error_message': self.backfill_id.last_error}
+
+        return {'state': 'done', 'progress': 100.0}
+
+    @api.model
+    def _write_outcome(self, job_id, vals):
+        """Store the final state of a job in its own transaction, like
+        :meth:`_report_progress`."""
+        with self.env.registry.cursor() as cr:
+            job = api.Environment(cr, SUPERUSER_ID, {})['biotime.job'].browse(job_id)
+            job.write(dict(vals, date_end=fields.Datetime.now()))
+
+    @api.model
+    def _report_progress(self, job_id, done, total, message=None):
+        """Store the progress of a running job in its own transaction, so it
+        is visible while the job transaction is still open, and stop the job
+        if it was cancelled meanwhile."""
+        progress = min(100.0, 100.0 * done / total) if total else 0.0
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE biotime_job
+                   SET progress = %s, progress_message = %s,
+                       date_heartbeat = now() AT TIME ZONE 'UTC'
+                 WHERE id = %s
+             RETURNING cancel_requested
+            """, (progress, message, job_id))
+            row = cr.fetchone()
+        if row and row[0]:
+            raise BiotimeJobCancelled("Cancelled by user")
@@ -0,0 +1,79 @@
+from urllib.parse import urlparse
+
+from odoo import models, fields, api
+
+
+class BiotimePageCache(models.Model):
+    _name = "biotime.page.cache"
+    _description = "Biotime API Page Cache"
+
+    server_id = fields.Many2one(
+        "biotime.server",
+        required=True,
+        ondelete="cascade"
+    )
+    url = fields.Char(required=True)
+    etag = fields.Char()
+    last_modified = fields.Char()
+    payload_hash = fields.Char()
+    next_url = fields.Char()
+    count = fields.Integer()
+
+    _server_url_uniq = models.Constraint(
+        'UNIQUE(server_id, url)',
+        "A page is cached once per server.",
+    )
+
+    @api.model
+    def _load(self, server):
+        """Return the cache entries of ``server`` as {url: entry}, in the
+        format of ``BiotimeClient.get_json_cached``."""
+        rows = self.search_read(
+            [('server_id', '=', server.id)],
+            ['url', 'etag', 'last_modified', 'payload_hash', 'next_url', 'count'],
+        )
+        return {
+            row['url']: {
+                'id': row['id'],
+                'etag': row['etag'] or None,
+                'last_modified': row['last_modified'] or None,
+                'hash': row['payload_hash'] or None,
+                'next': row['next_url'] or None,
+                'count': row['count'],
+            }
+            for row in rows
+        }
+
+    @api.model
+    def _store(self, server, cache, old_cache, visited=None):
+        """Write back the entries of ``cache`` that differ from ``old_cache``:
+        changed ones with one write each, new ones with one multi-create.
+
+        Entries of the endpoints of ``visited`` that were not visited are
+        deleted: their URL holds a filter value of a previous run (e.g. the
+        biodata ``update_time``) and would never be requested again.
+        """
+        if visited:
+            paths = {urlparse(url).path for url in visited}
+            obsolete = [
+                entry['id'] for url, entry in old_cache.items()
+                if url not in visited and urlparse(url).path in paths
+            ]
+            self.browse(obsolete).unlink()
+
+        to_create = []
+        for url, entry in cache.items():
+            vals = {
+                'etag': entry.get('etag') or False,
+                'last_modified': entry.get('last_modified') or False,
+                'payload_hash': entry.get('hash') or False,
+                'next_url': entry.get('next') or False,
+                'count': entry.get('count') or 0,
+            }
+            old = old_cache.get(url)
+            if not old:
+                to_create.append(dict(vals, server_id=server.id, url=url))
+            elif any(entry.get(key) != old.get(key) for key in ('etag', 'last_modified', 'hash', 'next', 'count')):
+                self.browse(old['id']).write(vals)
+        if to_create:
+            self.create(to_create)
@@ -0,0 +1,90 @@
+import secrets
+
+import pytz
+
+from odoo import models, fields
+from odoo.addons.base.models.res_partner import _tz_get
+
+
+class BiotimeServer(models.Model):
+    _name = "biotime.server"
+    _description = "Biotime Server"
+    _order = "sequence, id"
+
+    name = fields.Char(required=True)
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+
+    base_url = fields.Char(string="URL", required=True)
+    username = fields.Char(required=True)
+    password = fields.Char(required=True, groups="hr.group_hr_manager")
+    # punch times sent by BioTime are local times of this zone
+    tz = fields.Selection(
+        _tz_get,
+        string="Timezone",
+        required=True,
+        default="Asia/Kolkata"
+    )
+
+    # shared secret of the push receiver (/biotime/push/<id>); no push
+    # is accepted while it is empty
+    push_secret = fields.Char(copy=False, groups="hr.group_hr_manager")
+    push_url = fields.Char(compute="_compute_push_url")
+
+    # transaction cursor: newest transaction ingested from this server
+    last_transaction_id = fields.Integer(readonly=True, copy=False)
+    last_punch_time = fields.Char(
+        readonly=True,
+        copy=False,
+        help="BioTime local time of the newest punch ingested."
+    )
+
+    # newest biodata update_time imported, start of the next biodata sync
+    biodata_update_time = fields.Char(readonly=True, copy=False)
+
+    terminal_ids = fields.One2many("biotime.terminal", "server_id")
+
+    def _compute_push_url(self):
+        base_url = self.get_base_url()
+        for rec in self:
+            rec.push_url = f"{base_url}/biotime/push/{rec.id}" if rec.id else False
+
+    def _get_tz(self):
+        self.ensure_one()
+        return pytz.timezone(self.tz or "Asia/Kolkata")
+
+    def _get_client(self):
+        self.ensure_one()
+        server = self.sudo()
+        return self.env['biotime.service']._get_client(
+            server.base_url.rstrip("/"), server.username, server.password
+        )
+
+    # ------------------------------------------------
+    # ACTIONS
+    # ------------------------------------------------
+
+    def action_sync_terminals(self):
+        return self.env['biotime.job']._enqueue('terminals', servers=self)._action_open()
+
+    def action_sync_biodata(self):
+        return self.env['biotime.job']._enqueue('biodata', servers=self)._action_open()
+
+    def action_sync_attendance(self):
+        return self.env['biotime.job']._enqueue('attendance', servers=self)._action_open()
+
+    def action_generate_push_secret(self):
+        for rec in self:
+            rec.push_secret = secrets.token_urlsafe(32)
+        return True
+
+    def action_reset_cursor(self):
+        """Restart transactions from today, and biodata and terminals from a
+        full, uncached download."""
+        self.write({
+            'last_transaction_id': 0,
+            'last_punch_time': False,
+            'biodata_update_time': False,
+        })
+        self.env['biotime.page.cache'].search([('server_id', 'in', self.ids)]).unlink()
+        return True
@@ -1,14 +1,29 @@
+import hashlib
+import json
+import zlib
 import requests   
-from odoo import models, fields , api
+from odoo import models, fields , api, SUPERUSER_ID
 from odoo.exceptions import UserError      
+from odoo.osv import expression
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from time import perf_counter
     
 from datetime import datetime,timedelta , time 
 import pytz 
 from urllib.parse import urlencode, urlparse, parse_qs 
 
+from .biotime_client import BiotimeClient
+from .hr_employee import normalize_emp_code
+
 _logger = logging.getLogger(__name__)
 
+# first key of the two-key PostgreSQL advisory locks taken by the connector
+EMPLOYEE_LOCK_NS = 75101
+RUN_LOCK_NS = 75102
+
 
 class BiotimeService(models.Model):
     _name = "biotime.service"
@@ -35,67 +50,355 @@ class BiotimeService(models.Model):
 
 
     
-    def _get_config(self):
+    def _get_servers(self):
+        """Active BioTime servers; each one is synced on its own."""
+        servers = self.env['biotime.server'].sudo().search([])
+        if not servers:
+            raise UserError("No Biotime server configured")
+        return servers
+
+    @api.model
+    def _get_tz(self):
+        """Default timezone (``biotime.timezone``) of punches and
+        attendances not linked to a Biotime server."""
         ICP = self.env['ir.config_parameter'].sudo()
-        base_url = ICP.get_param('biotime.base_url')
-        username = ICP.get_param('biotime.username')
-        password = ICP.get_param('biotime.password')
+        return pytz.timezone(ICP.get_param('biotime.timezone') or "Asia/Kolkata")
 
-        if not base_url or not username or not password:
-            raise UserError("Biotime credentials missing")
-        # _logger.warning("This is ______________________________ username %s password %s link %s",username,password,base_url)
-        return base_url, username, password
+    def _get_client(self, base_url, username, password):
+        """Return a pooled BioTime HTTP client (keep-alive session, retries).
+
+        Pool size, parallel page workers and retry policy are read from
+        ir.config_parameter (``biotime.pool_size``, ``biotime.max_workers``,
+        ``biotime.http_retries``, ``biotime.http_backoff``).
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        return BiotimeClient(
+            base_url,
+            username,
+            password,
+            pool_size=int(ICP.get_param('biotime.pool_size', 8)),
+            max_workers=int(ICP.get_param('biotime.max_workers', 4)),
+            retries=int(ICP.get_param('biotime.http_retries', 3)),
+            backoff=float(ICP.get_param('biotime.http_backoff', 0.5)),
+            stats=self.env.context.get('biotime_run_stats'),
+        )
 
     # ------------------------------------------------
-    # FETCH TERMINALS
+    # RUN METRICS
     # ------------------------------------------------
 
-    def _safe_paginated_get(self, start_url, username, password, max_pages=30):
-        url = start_url
-        seen_urls = set()
-        pages = 0
-    
-        while url and url not in seen_urls and pages < max_pages:
-            seen_urls.add(url)
-            pages += 1
-            # _logger.warning("This is ______________________________pages %s",pages)
-    
-            res = requests.get(url, auth=(username, password), timeout=30)
-            res.raise_for_status()
-    
-            payload = res.json()
-            # _logger.warning("This is ______________________________ payload details %s",payload)
-            yield payload
-    
-            url = payload.get("next")
+    def _stat(self, key, value=1):
+        """Add ``value`` to a counter of the current biotime.sync.run, if any."""
+        stats = self.env.context.get('biotime_run_stats')
+        if stats is not None:
+            stats[key] += value
+
+    def _job_progress(self, done, total, message=None):
+        """Report the progress of the biotime.job running this sync, if any.
 
+        Raises ``BiotimeJobCancelled`` when the job was cancelled.
+        """
+        job_id = self.env.context.get('biotime_job_id')
+        if job_id:
+            self.env['biotime.job']._report_progress(job_id, done, total, message)
 
+    def _report_unknown_codes(self, unknown):
+        """Collect BioTime codes matching no employee ({code: records}).
+
+        Within a tracked run they are logged once and stored on the
+        biotime.sync.run at its end; otherwise they are logged right away.
+        """
+        if not unknown:
+            return
+        collected = self.env.context.get('biotime_unknown_codes')
+        if collected is not None:
+            collected.update(unknown)
+        else:
+            _logger.warning(f"Biotime codes without employee: {self._format_unknown_codes(unknown)}")
+
+    @api.model
+    def _format_unknown_codes(self, unknown):
+        return ", ".join(f"{code} ({count})" for code, count in sorted(unknown.items()))
+
+    @contextmanager
+    def _collect_attendance_days(self):
+        """Yield the service with an ``attendance_changed_days`` collector
+        and report the collected days to
+        ``hr.attendance._attendance_days_changed`` once at the end, instead
+        of once per attendance write."""
+        days = set()
+        yield self.with_context(attendance_changed_days=days)
+        if days:
+            self.env['hr.attendance']._attendance_days_changed(days)
+
+    @contextmanager
+    def _timed(self, key):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._stat(key, perf_counter() - start)
+
+    def _write_sync_run(self, run_id, vals):
+        """Create or update a biotime.sync.run in its own transaction, so the
+        history survives a sync that fails and rolls back."""
+        with self.env.registry.cursor() as cr:
+            Run = api.Environment(cr, SUPERUSER_ID, {})['biotime.sync.run']
+            if run_id:
+                Run.browse(run_id).write(vals)
+                return run_id
+            return Run.create(vals).id
+
+    # ------------------------------------------------
+    # LOCKING
+    # ------------------------------------------------
+
+    def _lock_employees(self, employee_ids, wait=False):
+        """Take the per-employee advisory lock of ``employee_ids`` for the
+        current transaction, in id order.
+
+        Without ``wait``, employees locked by another transaction are not
+        waited for and left out of the result. Returns the set of employee
+        ids locked (locks already held by this transaction count as taken).
+        """
+        ids = sorted(set(employee_ids))
+        if not ids:
+            return set()
+        if wait:
+            self.env.cr.execute(
+                "SELECT pg_advisory_xact_lock(%s, id) FROM unnest(%s::int[]) AS id",
+                (EMPLOYEE_LOCK_NS, ids)
+            )
+            return set(ids)
+        self.env.cr.execute(
+            "SELECT id FROM unnest(%s::int[]) AS id WHERE pg_try_advisory_xact_lock(%s, id)",
+            (ids, EMPLOYEE_LOCK_NS)
+        )
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def _try_run_lock(self, sync_type, server=None):
+        """Run-level mutex: lock one sync type (of one server) for the
+        current transaction. Returns False if another run holds it."""
+        key = zlib.crc32(f"{sync_type}:{server.id if server else 0}".encode()) & 0x7FFFFFFF
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (RUN_LOCK_NS, key))
+        return self.env.cr.fetchone()[0]
+
+    def _run_tracked(self, sync_type, method_name, server=None, *args):
+        """Run ``method_name`` (on ``server`` if given, then ``args``) and
+        record its metrics as a biotime.sync.run.
+
+        Apart from pushes, a sync type runs once at a time per server: a run
+        started while another one holds the mutex is skipped.
+        """
+        if sync_type != 'push' and not self._try_run_lock(sync_type, server):
+            _logger.info(
+                f"Biotime {sync_type} sync {server.name if server else ''} "
+                f"already running, skipped"
+            )
+            return False
+
+        stats = Counter()
+        unknown = Counter()
+        run_id = self._write_sync_run(False, {
+            'sync_type': sync_type,
+            'server_id': server.id if server else False,
+        })
+        start = perf_counter()
+
+        Run = self.env['biotime.sync.run']
+        run_context = {'biotime_run_stats': stats, 'biotime_unknown_codes': unknown}
+        # the server carries the run context too: its HTTP client
+        # (server._get_client) reports pages and HTTP time to ``stats``
+        args = ((server.with_context(**run_context),) if server else ()) + args
+        try:
+            result = getattr(self.with_context(**run_context), method_name)(*args)
+        except Exception as e:
+            stats['error_count'] += 1
+            self._write_sync_run(run_id, dict(
+                Run._stats_to_vals(stats),
+                self._unknown_codes_vals(unknown),
+                state='failed',
+                date_end=fields.Datetime.now(),
+                duration=perf_counter() - start,
+                error_message=str(e),
+            ))
+            raise
+
+        self._write_sync_run(run_id, dict(
+            Run._stats_to_vals(stats),
+            self._unknown_codes_vals(unknown),
+            state='done',
+            date_end=fields.Datetime.now(),
+            duration=perf_counter() - start,
+        ))
+        return result
+
+    def _unknown_codes_vals(self, unknown):
+        if not unknown:
+            return {}
+        codes = self._format_unknown_codes(unknown)
+        _logger.warning(f"Biotime codes without employee: {codes}")
+        return {'unknown_code_count': len(unknown), 'unknown_codes': codes}
+
+    def _run_servers(self, sync_type, method_name, servers=None):
+        """Run ``method_name(server)`` for every server (all active ones by
+        default).
+
+        A single server runs in the current transaction. Several servers run
+        in parallel, up to ``biotime.server_workers`` (4) at a time, each in
+        its own thread, cursor and transaction: a slow or failing server
+        neither delays nor rolls back the others. Failures are raised
+        together once every server is done.
+        """
+        servers = servers or self._get_servers()
+        if len(servers) == 1:
+            return self._run_tracked(sync_type, method_name, servers)
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_workers = int(ICP.get_param('biotime.server_workers', 4))
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(servers)))) as executor:
+            futures = {
+                executor.submit(self._run_server_thread, sync_type, method_name, server.id): server
+                for server in servers
+            }
+            for future in as_completed(futures):
+                server = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    _logger.exception(f"Biotime {sync_type} sync failed for server {server.name}")
+                    errors.append(f"{server.name}: {e}")
+
+        if errors:
+            raise UserError("Biotime sync failed:\n" + "\n".join(errors))
+        return True
+
+    def _run_server_thread(self, sync_type, method_name, server_id):
+        """Thread body of :meth:`_run_servers`: run one server sync in a new
+        cursor, committed when the sync succeeds."""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, dict(self.env.context))
+            server = env['biotime.server'].browse(server_id)
+            env['biotime.service']._run_tracked(sync_type, method_name, server)
+
+    # ------------------------------------------------
+    # BULK UPSERT
+    # ------------------------------------------------
+
+    def _upsert_by_biotime_id(self, model_name, vals_list, server):
+        """Create or update ``model_name`` rows of ``server`` keyed by
+        ``biotime_id``.
+
+        Every incoming row is hashed; existing rows are loaded with one
+        query reading only their ``payload_hash``, so rows whose hash did not
+        change are skipped without loading them. The others are compared
+        field by field: only changed fields are written, and all new rows are
+        created with one multi-create. Returns ``(created, updated)`` counts.
+        """
+        with self._timed('db_time'):
+            return self._upsert_by_biotime_id_impl(model_name, vals_list, server)
+
+    def _upsert_by_biotime_id_impl(self, model_name, vals_list, server):
+        Model = self.env[model_name]
+
+        incoming = {}
+        for vals in vals_list:
+            if vals.get('biotime_id'):
+                # the last payload wins when the API repeats an id
+                incoming[vals['biotime_id']] = dict(
+                    vals,
+                    server_id=server.id,
+                    payload_hash=hashlib.sha1(
+                        json.dumps(vals, sort_keys=True, default=str).encode()
+                    ).hexdigest(),
+                )
+        if not incoming:
+            return 0, 0
+
+        existing = {
+            row['biotime_id']: row
+            for row in Model.search_read([
+                ('server_id', '=', server.id),
+                ('biotime_id', 'in', list(incoming)),
+            ], ['biotime_id', 'payload_hash'])
+        }
+
+        to_create = []
+        updated = 0
+        for biotime_id, vals in incoming.items():
+            row = existing.get(biotime_id)
+            if not row:
+                to_create.append(vals)
+                continue
+            if row['payload_hash'] == vals['payload_hash']:
+                continue
+
+            rec = Model.browse(row['id'])
+
+            changes = {}
+            for fname, value in vals.items():
+                field = Model._fields[fname]
+                new_value = field.convert_to_record(
+                    field.convert_to_cache(value, rec), rec
+                )
+                if new_value != rec[fname]:
+                    changes[fname] = value
+            if changes:
+                rec.write(changes)
+                updated += 1
+
+        if to_create:
+            Model.create(to_create)
+
+        _logger.info(
+            f"{model_name} upsert: {len(to_create)} created, {updated} updated, "
+            f"{len(incoming) - len(to_create) - updated} unchanged"
+        )
+        return len(to_create), updated
 
-    
     def sync_terminals(self):
-        base_url, username, password = self._get_config()
-        url = f"{base_url}/iclock/api/terminals/"
+        return self._run_servers('terminals', '_sync_terminals')
+
+    def _iter_cached_pages(self, server, client, start_url, max_pages):
+        """Yield the payload of every changed page from ``start_url``.
+
+        Pages answered 304 or identical to the cached copy are skipped
+        before any JSON parsing or ORM work; the cache is written back at
+        the end, in the same transaction as the imported data, and entries
+        of the endpoint not requested by this run are dropped.
+        """
+        Cache = self.env['biotime.page.cache']
+        old_cache = Cache._load(server)
+        cache = dict(old_cache)
+        visited = set()
+        for url, payload in client.iter_pages_cached(start_url, max_pages, cache):
+            visited.add(url)
+            if payload is None:
+                self._stat('pages_unchanged')
+                continue
+            yield payload
+        with self._timed('db_time'):
+            Cache._store(server, cache, old_cache, visited)
 
-        res = requests.get(url, auth=(username, password), timeout=30)
-        res.raise_for_status()
-        _logger.warning("This is ______________________________ record terminal %s",res)
+    def _sync_terminals(self, server):
+        client = server._get_client()
+        url = f"{client.base_url}/iclock/api/terminals/"
+
+        data = []
+        for payload in self._iter_cached_pages(server, client, url, 30):
+            data.extend(payload.get('data', []))
 
         _logger.warning(
-            "Biotime terminal API response: status=%s, count=%s",
-            res.status_code,
-            len(res.json().get('data', []))
+            "Biotime terminal API response: count=%s",
+            len(data)
         )
 
-        Terminal = self.env['biotime.terminal']
-        data = res.json().get('data', [])
-
+        vals_list = []
         for t in data:
 
-            terminal = Terminal.search([
-                ('biotime_id', '=', t['id'])
-            ], limit=1)
-            
-            vals = {
+            vals_list.append({
                 'biotime_id': t.get('id'),
                 'sn': t.get('sn'),
                 'ip_address': t.get('ip_address'),
@@ -117,44 +420,59 @@ class BiotimeService(models.Model):
                 'is_attendance': t.get('is_attendance'),
                 'area_name': t.get('area_name'),
                 'company_uid': t.get('company'),
-            }
-            
-            if terminal:
-                terminal.write(vals)
-            else:
-                Terminal.create(vals)
+            })
+
+        self._upsert_by_biotime_id('biotime.terminal', vals_list, server)
 
-  
 
     def sync_biodata(self):
-        base_url, username, password = self._get_config()
-        start_url = f"{base_url}/iclock/api/biodatas/"
+        return self._run_servers('biodata', '_sync_biodata')
+
+    def _sync_biodata(self, server):
+        """Import the biodata modified since the previous run.
+
+        Templates are requested by ``update_time`` from the newest one seen
+        by the previous run of ``server`` (query parameter
+        ``biotime.biodata_since_param``, also filtered here in case the
+        server ignores it); unchanged pages come from the page cache.
+        """
+        client = server._get_client()
+        ICP = self.env['ir.config_parameter'].sudo()
+        since = server.biodata_update_time
+        query = {'ordering': 'update_time'}
+        if since:
+            query[ICP.get_param('biotime.biodata_since_param', 'update_time__gte')] = since
+        start_url = f"{client.base_url}/iclock/api/biodatas/?{urlencode(query)}"
     
-        Biodata = self.env['biotime.biodata']
-        Employee = self.env['hr.employee']
+        employee_map = self._get_employee_code_map()
     
-        for payload in self._safe_paginated_get(start_url, username, password):
+        unknown = Counter()
+        newest = since
+        for page, payload in enumerate(self._iter_cached_pages(server, client, start_url, 30)):
             data = payload.get("data", [])
+            if data:
+                total_pages = -(-(payload.get("count") or 0) // len(data))
+                self._job_progress(page, total_pages, f"Page {page + 1} of {total_pages}")
     
             _logger.info("Biotime biodata page fetched: %s records", len(data))
     
+            vals_list = []
             for b in data:
                 if not b.get("employee"):
                     continue
+                update_time = b.get("update_time")
+                if since and update_time and update_time < since:
+                    continue
+                if update_time and (not newest or update_time > newest):
+                    newest = update_time
     
-                emp_code = b["employee"].split()[0]
-    
-                employee = Employee.search(
-                    [('x_studio_emp_id', '=', emp_code)],
-                    limit=1
-                )
-    
-                biodata = Biodata.search(
-                    [('biotime_id', '=', b.get("id"))],
-                    limit=1
-                )
+                emp_code = normalize_emp_code(b["employee"])
+                employee_id = employee_map.get(emp_code)
+                if not employee_id:
+                    unknown[emp_code] += 1
     
-                vals = {
+                vals_list.append({
+                    'biotime_id': b.get('id'),
                     'employee_name': b.get('employee'),
                     'emp_code': emp_code,
                     'bio_type': b.get('bio_type'),
@@ -163,58 +481,37 @@ class BiotimeService(models.Model):
                     'bio_tmp': b.get('bio_tmp'),
                     'major_ver': b.get('major_ver'),
                     'update_time': b.get('update_time'),
-                    'employee_id': employee.id if employee else False,
-                }
+                    'employee_id': employee_id or False,
+                })
     
-                if biodata:
-                    biodata.write(vals)
-                else:
-                    vals['biotime_id'] = b.get('id')
-                    Biodata.create(vals)
-
-
+            # one upsert per page keeps the large bio_tmp blobs of a single
+            # page in memory at a time
+            self._upsert_by_biotime_id('biotime.biodata', vals_list, server)
 
+        self._report_unknown_codes(unknown)
+        if newest != since:
+            server.biodata_update_time = newest
 
+        self._relink_biodata(server, employee_map)
 
-
-    def _safe_paginated_get_line(self, start_url, username, password, max_pages=200):
-        url = start_url
-        seen_urls = set()
-        page = 100
-    
-        while url:
-            if url in seen_urls:
-                _logger.warning(
-                    "Biotime pagination stopped (repeated URL): %s", url
-                )
-                break
-    
-            if page >= max_pages:
-                _logger.warning(
-                    "Biotime pagination stopped (max pages %s reached)", max_pages
-                )
-                break
-    
-            seen_urls.add(url)
-            page += 1
-    
-            _logger.info("Fetching Biotime page %s: %s", page, url)
-    
-            res = requests.get(url, auth=(username, password), timeout=30)
-            res.raise_for_status()
-    
-            payload = res.json()
-            yield payload
-    
-            next_url = payload.get("next")
-    
-            # Normalize relative URL
-            if next_url and next_url.startswith("/"):
-                base = start_url.split("/iclock/api")[0]
-                next_url = base + next_url
-    
-            url = next_url
-
+    def _relink_biodata(self, server, employee_map):
+        """Link the templates of ``server`` imported before their employee
+        existed: unchanged pages and the update_time filter never bring
+        them back through the upsert. One write per matching code."""
+        Biodata = self.env['biotime.biodata']
+        groups = Biodata._read_group(
+            [('server_id', '=', server.id), ('employee_id', '=', False), ('emp_code', '!=', False)],
+            ['emp_code'], ['id:array_agg'],
+        )
+        relinked = 0
+        with self._timed('db_time'):
+            for emp_code, ids in groups:
+                employee_id = employee_map.get(emp_code)
+                if employee_id:
+                    Biodata.browse(ids).write({'employee_id': employee_id})
+                    relinked += len(ids)
+        if relinked:
+            _logger.info(f"Biotime biodata: {relinked} template(s) linked to their employee")
 
     def _sanitize_punch_state(self, value):
         """
@@ -230,7 +527,13 @@ class BiotimeService(models.Model):
     
     
 
-    def _safe_paginated_get_line_new(self,start_url,username,password,start_page=1,max_pages=6):
+    def _safe_paginated_get_line_new(self,start_url,username,password,start_page=1,max_pages=6,parallel=False):
+        client = self._get_client(start_url.split("/iclock/api")[0], username, password)
+
+        if parallel:
+            yield from client.fetch_pages(start_url, max_pages, start_page=start_page)
+            return
+
         parsed = urlparse(start_url)
         query = parse_qs(parsed.query)
         query["page"] = [str(start_page)]
@@ -264,25 +567,13 @@ class BiotimeService(models.Model):
                 url
             )
     
-            res = requests.get(
-                url,
-                auth=(username, password),
-                timeout=30
-            )
-            res.raise_for_status()
-    
-            payload = res.json()
+            payload = client.get_json(url, timeout=30)
             yield payload
     
-            next_url = payload.get("next")
-            if not next_url:
+            url = client.absolute(payload.get("next"))
+            if not url:
                 break
     
-            if next_url.startswith("/"):
-                base = start_url.split("/iclock/api")[0]
-                next_url = base + next_url
-    
-            url = next_url
             page_count += 1
     
         
@@ -330,21 +621,50 @@ class BiotimeService(models.Model):
 
 
 
-    def _reset_and_revalidate_work_entries(self, employee_id):
-        """Reset all validated work entries for employee to draft,
-        return them so caller can re-validate after attendance is updated."""
-        _logger = logging.getLogger(__name__)
+    def _work_entry_window_domain(self, employee_id, date_from, date_to, ist):
+        """Domain of the work entries of one employee between two local dates."""
         WorkEntry = self.env['hr.work.entry']
-        entries = WorkEntry.search([
+        if 'date' in WorkEntry._fields:
+            return [
+                ('employee_id', '=', employee_id),
+                ('date', '>=', date_from),
+                ('date', '<=', date_to),
+            ]
+        start_utc = ist.localize(
+            datetime.combine(date_from, time(0, 0, 0))
+        ).astimezone(pytz.UTC).replace(tzinfo=None)
+        end_utc = ist.localize(
+            datetime.combine(date_to, time(23, 59, 59))
+        ).astimezone(pytz.UTC).replace(tzinfo=None)
+        return [
             ('employee_id', '=', employee_id),
-            ('state', '=', 'validated'),
+            ('date_start', '<=', end_utc),
+            ('date_stop', '>=', start_utc),
+        ]
+
+    def _reset_and_revalidate_work_entries(self, windows, ist):
+        """Reset the validated work entries of every {employee_id: (date_from,
+        date_to)} window to draft with one search and one write, and return
+        them so the caller can re-validate after attendance is updated."""
+        _logger = logging.getLogger(__name__)
+        WorkEntry = self.env['hr.work.entry']
+        if not windows:
+            return WorkEntry
+
+        domain = expression.OR([
+            self._work_entry_window_domain(employee_id, date_from, date_to, ist)
+            for employee_id, (date_from, date_to) in windows.items()
         ])
+        entries = WorkEntry.search(
+            expression.AND([domain, [('state', '=', 'validated')]])
+        )
         if entries:
             _logger.info(
                 f"  → Resetting {len(entries)} validated work entry(ies) to draft "
-                f"for Employee {employee_id}"
+                f"for {len(windows)} employee(s)"
             )
             entries.write({'state': 'draft'})
+            self._stat('work_entry_resets', len(entries))
         return entries
 
     def _revalidate_work_entries(self, entries):
@@ -358,388 +678,774 @@ class BiotimeService(models.Model):
             entries.write({'state': 'validated'})
         _logger.info(f"  → Re-validated {len(entries)} work entry(ies) ✓")
 
-    def sync_attendance(self):
-    
-        _logger = logging.getLogger(__name__)
-        _logger.info("=== BIOTIME SYNC STARTED ===")
-    
-        base_url, username, password = self._get_config()
-    
-        HrAttendance = self.env['hr.attendance']
-        HrAttendanceLine = self.env['hr.attendance.line']
-        Employee = self.env['hr.employee']
-    
-        ist = pytz.timezone("Asia/Kolkata")
-    
-        today_ist = datetime.now(ist).date()
-        _logger.info(f"Syncing only from today: {today_ist}")
-    
-        start_url = f"{base_url}/iclock/api/transactions/?ordering=+-id"
-    
-        all_transactions = []
-        page_count = 0
-        max_pages = 25
-        url = start_url
-    
-        # =====================================================
-        # 1️⃣ FETCH LATEST 6 PAGES
-        # =====================================================
-        while url and page_count < max_pages:
-    
-            _logger.info(f"Fetching page {page_count + 1}")
-
-            try:
-                res = requests.get(url, auth=(username, password), timeout=60)
-                res.raise_for_status()
-            except requests.exceptions.Timeout:
-                _logger.warning(f"BioTime API timed out on page {page_count + 1}, stopping fetch with {len(all_transactions)} transactions so far")
-                break
-            except requests.exceptions.RequestException as e:
-                _logger.warning(f"BioTime API error on page {page_count + 1}: {e}, stopping fetch")
-                break
-
-            payload = res.json()
-            data = payload.get("data", [])
+    # ------------------------------------------------
+    # BATCH INGESTION
+    # ------------------------------------------------
 
-            if not data:
-                break
+    def _get_employee_code_map(self):
+        """Return the cached {BioTime code: employee_id} map; see
+        ``hr.employee._get_biotime_code_map``. Look codes up with
+        ``normalize_emp_code``."""
+        return self.env['hr.employee']._get_biotime_code_map()
+
+    def _get_imported_transaction_ids(self, tx_ids, server):
+        """Return the subset of ``tx_ids`` already stored as punch lines of
+        ``server``, live or archived, using one range query per table over
+        the fetched id window."""
+        if not tx_ids:
+            return set()
+        domain = [
+            ('server_id', '=', server.id),
+            ('biotime_transaction_id', '>=', min(tx_ids)),
+            ('biotime_transaction_id', '<=', max(tx_ids)),
+        ]
+        imported = set()
+        for model in ('hr.attendance.line', 'hr.attendance.line.archive'):
+            rows = self.env[model].search_read(domain, ['biotime_transaction_id'])
+            imported.update(row['biotime_transaction_id'] for row in rows)
+        return imported
+
+    def _group_transactions(self, transactions, server, employee_map=None):
+        """Filter raw BioTime transactions of ``server`` and group them by
+        (employee, local date in the server timezone).
+
+        Already imported transactions, unknown employees and unparsable
+        punch times are dropped. Every punch_time is parsed exactly once.
+        """
+        ist = server._get_tz()
+        tx_ids = [tx.get("id") for tx in transactions if tx.get("id")]
+        imported = self._get_imported_transaction_ids(tx_ids, server)
+        if employee_map is None:
+            employee_map = self._get_employee_code_map()
 
-            all_transactions.extend(data)
-    
-            url = payload.get("next")
-            page_count += 1
-    
-        if not all_transactions:
-            _logger.info("No transactions found.")
-            return
-    
-        _logger.info(f"Total transactions fetched: {len(all_transactions)}")
-    
-        # =====================================================
-        # 2️⃣ SORT BY punch_time ASC
-        # =====================================================
-        def parse_time(tx):
-            try:
-                return datetime.strptime(tx["punch_time"], "%Y-%m-%d %H:%M:%S")
-            except:
-                return datetime.min
-    
-        all_transactions.sort(key=parse_time)
-    
-        # =====================================================
-        # 3️⃣ GROUP BY EMPLOYEE + DATE (ONLY TODAY)
-        # =====================================================
         grouped = {}
-    
-        for tx in all_transactions:
-    
+        unknown = Counter()
+        for tx in transactions:
+
             tx_id = tx.get("id")
-            emp_code = tx.get("emp_code")
-    
-            if not tx_id or not emp_code:
-                continue
-    
-            # Skip already imported punch
-            if HrAttendanceLine.search(
-                [('biotime_transaction_id', '=', tx_id)],
-                limit=1
-            ):
+            emp_code = normalize_emp_code(tx.get("emp_code"))
+
+            if not tx_id or not emp_code or tx_id in imported:
                 continue
-    
-            employee = Employee.search(
-                [('x_studio_emp_id', '=', emp_code)],
-                limit=1
-            )
-            if not employee:
+
+            employee_id = employee_map.get(emp_code)
+            if not employee_id:
+                unknown[emp_code] += 1
                 continue
-    
+
             try:
                 local_dt = datetime.strptime(
                     tx["punch_time"], "%Y-%m-%d %H:%M:%S"
                 )
-            except:
+            except (KeyError, TypeError, ValueError):
                 continue
-    
+
             ist_dt = ist.localize(local_dt)
-    
-            # 🔴 SKIP OLD DATES
-            # if ist_dt.date() < today_ist:
-            #     continue
-    
             utc_dt = ist_dt.astimezone(pytz.UTC).replace(tzinfo=None)
-            punch_date = ist_dt.date()
-    
+
             grouped.setdefault(
-                (employee.id, punch_date),
+                (employee_id, ist_dt.date()),
                 []
             ).append({
                 "tx_id": tx_id,
+                "server_id": server.id,
                 "punch_time": utc_dt,
+                "local_date": ist_dt.date(),
                 "terminal_sn": tx.get("terminal_sn"),
                 "terminal_alias": tx.get("terminal_alias"),
             })
-    
+            # a transaction listed twice in the same batch is imported once
+            imported.add(tx_id)
+
+        self._report_unknown_codes(unknown)
+        grouped_count = sum(len(punches) for punches in grouped.values())
+        self._stat('tx_seen', len(transactions))
+        self._stat('tx_skipped', len(transactions) - grouped_count)
+        return grouped
+
+    def _prefetch_day_attendances(self, grouped):
+        """Load the existing attendance of every (employee, IST date) group
+        with one search, keyed like ``grouped``."""
+        if not grouped:
+            return {}
+
+        attendances = self.env['hr.attendance'].search([
+            ('employee_id', 'in', list({employee_id for employee_id, _ in grouped})),
+            ('local_date', 'in', list({punch_date for _, punch_date in grouped})),
+        ])
+
+        existing = {}
+        # hr.attendance is ordered by check_in desc: keep the first match,
+        # as the former per-group search(limit=1) did
+        for att in attendances:
+            existing.setdefault((att.employee_id.id, att.local_date), att)
+        return existing
+
+    def _ingest_transactions(self, transactions, server, contended=None):
+        """Set-based import of raw BioTime transactions of ``server``.
+
+        Duplicates and employees are resolved with one query each, existing
+        attendances are prefetched once, and every punch line is written with
+        a single multi-create. See :meth:`_write_groups` for ``contended``.
+        """
+        with self._timed('db_time'):
+            deferred = []
+            grouped = self._group_transactions(transactions, server)
+            imported = self._write_groups(grouped, server, deferred, contended)
+            imported += self._apply_deferred_writes(deferred, server)
+            return imported
+
+    def _ingest_pages(self, pages, server, contended=None):
+        """Streaming import of an iterable of transaction pages.
+
+        Pages are grouped as they arrive; an (employee, date) group is
+        written as soon as a page only holds later dates, so memory stays
+        bounded by the groups still open instead of the whole history.
+        Transactions come oldest first, so this is usually the previous day.
+
+        Groups of employees locked by another transaction are collected in
+        ``contended`` (see :meth:`_write_groups`) and retried once at the end.
+        """
+        employee_map = self._get_employee_code_map()
+
+        pending = {}
+        deferred = []
+        imported = 0
+        for data in pages:
+            with self._timed('db_time'):
+                grouped = self._group_transactions(data, server, employee_map=employee_map)
+            if not grouped:
+                continue
+
+            for key, punches in grouped.items():
+                pending.setdefault(key, []).extend(punches)
+
+            oldest_date = min(punch_date for _, punch_date in grouped)
+            ready = {
+                key: pending.pop(key)
+                for key in list(pending)
+                if key[1] < oldest_date
+            }
+            if ready:
+                with self._timed('db_time'):
+                    imported += self._write_groups(ready, server, deferred, contended)
+                    # drop flushed records from the cache to keep memory flat
+                    self.env.invalidate_all()
+
+        with self._timed('db_time'):
+            if pending:
+                imported += self._write_groups(pending, server, deferred, contended)
+            if contended:
+                # the other worker may be done by now
+                retry = dict(contended)
+                contended.clear()
+                imported += self._write_groups(retry, server, deferred, contended)
+            # locked attendances of the whole run are retried once, together
+            imported += self._apply_deferred_writes(deferred, server)
+        return imported
+
+    def _punch_line_vals(self, attendance, employee_id, punches):
+        return [{
+            'attendance_id': attendance.id,
+            'employee_id': employee_id,
+            'punch_time': p["punch_time"],
+            'local_date': p["local_date"],
+            'punch_state': False,
+            'terminal_sn': p["terminal_sn"],
+            'terminal_alias': p["terminal_alias"],
+            'server_id': p["server_id"],
+            'biotime_transaction_id': p["tx_id"],
+        } for p in punches]
+
+    def _write_groups(self, grouped, server, deferred, contended=None):
+        """Write grouped punches to hr.attendance and hr.attendance.line.
+
+        The employees of the groups are locked first. When ``contended`` is
+        a dict, groups of employees locked by another transaction are moved
+        to it, keyed like ``grouped``, instead of being waited for: parallel
+        workers split the employees between them. When it is None, the locks
+        are waited for.
+
+        Writes refused because of validated work entries are appended to
+        ``deferred`` instead of being retried one by one; see
+        :meth:`_apply_deferred_writes`. Returns the number of punch lines
+        created.
+        """
+        HrAttendanceLine = self.env['hr.attendance.line']
+
+        locked = self._lock_employees(
+            {employee_id for employee_id, _ in grouped},
+            wait=contended is None,
+        )
+        if contended is not None:
+            for key, punches in grouped.items():
+                if key[0] not in locked:
+                    contended.setdefault(key, []).extend(punches)
+                    self._stat('lock_skipped', len(punches))
+            grouped = {key: punches for key, punches in grouped.items() if key[0] in locked}
         _logger.info(f"Employees to process: {len(grouped)}")
-    
-        # =====================================================
-        # 4️⃣ PROCESS
-        # =====================================================
-        for (employee_id, punch_date), punches in grouped.items():
-    
-            punches.sort(key=lambda x: x["punch_time"])
-    
-            first_punch = punches[0]["punch_time"]
-            last_punch = punches[-1]["punch_time"]
-    
-            punch_times_ist = [
-                pytz.UTC.localize(p["punch_time"]).astimezone(ist).strftime("%H:%M")
-                for p in punches
-            ]
+
+        line_vals = []
+        # hr.attendance writes below are covered by the locks just taken
+        with self.with_context(biotime_employee_locked=True)._collect_attendance_days() as service:
+            existing_map = service._prefetch_day_attendances(grouped)
+
+            for (employee_id, punch_date), punches in grouped.items():
+                punches.sort(key=lambda x: x["punch_time"])
+                attendance = service._apply_attendance_group(
+                    employee_id,
+                    punch_date,
+                    punches,
+                    existing_map.get((employee_id, punch_date)),
+                    server,
+                    deferred,
+                )
+                if not attendance:
+                    continue
+
+                line_vals.extend(
+                    self._punch_line_vals(attendance, employee_id, punches)
+                )
+
+        # -----------------------------------------------
+        # CREATE PUNCH LINES (one insert, duplicates skipped)
+        # -----------------------------------------------
+        created = len(HrAttendanceLine._create_ignore_duplicates(line_vals))
+        # lines inserted meanwhile by an overlapping worker are skipped
+        self._stat('tx_imported', created)
+        self._stat('tx_skipped', len(line_vals) - created)
+        _logger.info(f"Punch lines created: {created}")
+
+        return created
+
+    def _apply_deferred_writes(self, deferred, server):
+        """Retry the attendance writes refused because of validated work entries.
+
+        The work entries of all affected employees, bounded to the affected
+        dates, are reset with one search and one write, every write is
+        retried, then all of them are re-validated in one call. Punch lines
+        of attendances created here are written with one multi-create.
+        Returns the number of punch lines created.
+        """
+        if not deferred:
+            return 0
+
+        windows = {}
+        for op in deferred:
+            date_from, date_to = windows.get(op['employee_id'], (op['date'], op['date']))
+            windows[op['employee_id']] = (min(date_from, op['date']), max(date_to, op['date']))
+
+        _logger.info(
+            f"Retrying {len(deferred)} locked attendance write(s) "
+            f"for {len(windows)} employee(s)"
+        )
+
+        line_vals = []
+        # the retried writes run with the collector of the _write_groups call
+        # that queued them, already reported: report their days here
+        changed_days = set()
+        work_entries = self._reset_and_revalidate_work_entries(windows, server._get_tz())
+        try:
+            for op in deferred:
+                try:
+                    with self.env.cr.savepoint():
+                        attendance = op['apply']()
+                    _logger.info(f"  → {op['label']} ✓ (after work entry reset)")
+                    self._stat(op['stat'])
+                    changed_days.add((op['employee_id'], op['date']))
+                except Exception as e2:
+                    _logger.warning(f"  → SKIPPED {op['label']} even after work entry reset: {e2}")
+                    self._stat('error_count')
+                    continue
+
+                if op.get('punches'):
+                    line_vals.extend(self._punch_line_vals(
+                        attendance, op['employee_id'], op['punches']
+                    ))
+        finally:
+            self._revalidate_work_entries(work_entries)
+
+        if changed_days:
+            self.env['hr.attendance']._attendance_days_changed(changed_days)
+
+        created = len(self.env['hr.attendance.line']._create_ignore_duplicates(line_vals))
+        self._stat('tx_imported', created)
+        self._stat('tx_skipped', len(line_vals) - created)
+
+        deferred.clear()
+        return created
+
+    def _apply_attendance_group(self, employee_id, punch_date, punches, existing, server, deferred):
+        """Merge one (employee, local date) group of sorted punches into
+        hr.attendance and return the attendance record, or False if it
+        could not be written yet (the write is then queued in ``deferred``)."""
+        HrAttendance = self.env['hr.attendance']
+        ist = server._get_tz()
+
+        first_punch = punches[0]["punch_time"]
+        last_punch = punches[-1]["punch_time"]
+
+        punch_times_ist = [
+            pytz.UTC.localize(p["punch_time"]).astimezone(ist).strftime("%H:%M")
+            for p in punches
+        ]
+        _logger.info(
+            f"Processing Employee {employee_id} "
+            f"{punch_date} | Punches: {len(punches)} | Times(IST): {punch_times_ist}"
+        )
+
+        if existing:
+
+            existing_in_ist = pytz.UTC.localize(existing.check_in).astimezone(ist).strftime("%H:%M")
+            existing_out_ist = (
+                pytz.UTC.localize(existing.check_out).astimezone(ist).strftime("%H:%M")
+                if existing.check_out else "None"
+            )
             _logger.info(
-                f"Processing Employee {employee_id} "
-                f"{punch_date} | Punches: {len(punches)} | Times(IST): {punch_times_ist}"
+                f"  → Found existing attendance ID {existing.id} | "
+                f"check_in={existing_in_ist} check_out={existing_out_ist} IST"
             )
 
-            # -----------------------------------------------
-            # FIND EXISTING ATTENDANCE FOR SAME DAY
-            # -----------------------------------------------
-            day_start_utc = ist.localize(
-                datetime.combine(punch_date, time(0, 0, 0))
-            ).astimezone(pytz.UTC).replace(tzinfo=None)
-            day_end_utc = ist.localize(
-                datetime.combine(punch_date, time(23, 59, 59))
-            ).astimezone(pytz.UTC).replace(tzinfo=None)
-
-            existing = HrAttendance.search([
-                ('employee_id', '=', employee_id),
-                ('check_in', '>=', day_start_utc),
-                ('check_in', '<=', day_end_utc),
-            ], limit=1)
+            new_checkin = min(existing.check_in, first_punch)
+            new_checkout = max(
+                existing.check_out or last_punch,
+                last_punch
+            )
+            has_checkout = new_checkout != new_checkin
+
+            new_in_ist = pytz.UTC.localize(new_checkin).astimezone(ist).strftime("%H:%M")
+            new_out_ist = pytz.UTC.localize(new_checkout).astimezone(ist).strftime("%H:%M") if has_checkout else "None"
+            _logger.info(
+                f"  → Will write: check_in={new_in_ist} check_out={new_out_ist} IST "
+                f"no_checkout={not has_checkout}"
+            )
+
+            vals = {
+                'check_in': new_checkin,
+                'check_out': new_checkout if has_checkout else False,
+                'x_studio_no_checkout': not has_checkout,
+            }
+            try:
+                with self.env.cr.savepoint():
+                    existing.write(vals)
+                _logger.info(f"  → Updated existing attendance ID {existing.id} ✓")
+                self._stat('attendance_updated')
+            except Exception:
+                # Retried after the run's batched work entry reset
+                deferred.append({
+                    'employee_id': employee_id,
+                    'date': punch_date,
+                    'label': f"update of attendance ID {existing.id}",
+                    'stat': 'attendance_updated',
+                    'apply': lambda att=existing, vals=vals: att.write(vals) and att,
+                })
+            return existing
+
+        _logger.info(f"  → No existing attendance found for Employee {employee_id} on {punch_date}")
 
-            if existing:
+        # Close any open previous-day record before creating new one
+        open_prev = HrAttendance.search([
+            ('employee_id', '=', employee_id),
+            ('check_out', '=', False),
+            ('local_date', '<', punch_date),
+        ], limit=1)
 
-                existing_in_ist = pytz.UTC.localize(existing.check_in).astimezone(ist).strftime("%H:%M")
-                existing_out_ist = (
-                    pytz.UTC.localize(existing.check_out).astimezone(ist).strftime("%H:%M")
-                    if existing.check_out else "None"
+        if open_prev:
+            prev_checkin_ist = pytz.UTC.localize(
+                open_prev.check_in
+            ).astimezone(ist)
+            prev_date = prev_checkin_ist.date()
+            if prev_checkin_ist.time() < time(19, 0, 0):
+                close_ist = ist.localize(
+                    datetime.combine(prev_date, time(19, 0, 0))
                 )
+            else:
+                close_ist = prev_checkin_ist + timedelta(minutes=15)
+            close_utc = close_ist.astimezone(pytz.UTC).replace(tzinfo=None)
+
+            _logger.info(
+                f"  → Open previous attendance ID {open_prev.id} found "
+                f"(check_in={prev_checkin_ist.strftime('%Y-%m-%d %H:%M')} IST) — "
+                f"will close at {close_ist.strftime('%H:%M')} IST"
+            )
+
+            close_vals = {
+                'check_out': close_utc,
+                'x_studio_no_checkout': True,
+            }
+            try:
+                with self.env.cr.savepoint():
+                    open_prev.write(close_vals)
                 _logger.info(
-                    f"  → Found existing attendance ID {existing.id} | "
-                    f"check_in={existing_in_ist} check_out={existing_out_ist} IST"
+                    f"  → Auto-closed attendance ID {open_prev.id} "
+                    f"at {close_ist.strftime('%Y-%m-%d %H:%M')} IST ✓"
                 )
+                self._stat('attendance_updated')
+            except Exception:
+                deferred.append({
+                    'employee_id': employee_id,
+                    'date': prev_date,
+                    'label': f"auto-close of attendance ID {open_prev.id}",
+                    'stat': 'attendance_updated',
+                    'apply': lambda att=open_prev, vals=close_vals: att.write(vals) and att,
+                })
+
+        has_checkout = len(punches) > 1 and last_punch != first_punch
+        first_ist = pytz.UTC.localize(first_punch).astimezone(ist).strftime("%H:%M")
+        last_ist = pytz.UTC.localize(last_punch).astimezone(ist).strftime("%H:%M")
+        _logger.info(
+            f"  → Creating attendance: check_in={first_ist} "
+            f"check_out={last_ist if has_checkout else 'None'} IST "
+            f"no_checkout={not has_checkout}"
+        )
+        vals = {
+            'employee_id': employee_id,
+            'biotime_server_id': server.id,
+            'check_in': first_punch,
+            'check_out': last_punch if has_checkout else False,
+            'x_studio_no_checkout': not has_checkout,
+        }
+        try:
+            with self.env.cr.savepoint():
+                attendance = HrAttendance.create(vals)
+            _logger.info(f"  → Created attendance ID {attendance.id} ✓")
+            self._stat('attendance_created')
+        except Exception:
+            # punch lines are written once the retried create succeeds
+            deferred.append({
+                'employee_id': employee_id,
+                'date': punch_date,
+                'label': f"attendance of Employee {employee_id} on {punch_date}",
+                'stat': 'attendance_created',
+                'apply': lambda vals=vals: HrAttendance.create(vals),
+                'punches': punches,
+            })
+            return False
+        return attendance
+
+    # ------------------------------------------------
+    # TRANSACTION CURSOR
+    # ------------------------------------------------
+
+    def _get_transactions_start_url(self, server):
+        """Build the transactions URL of ``server`` resuming from its cursor.
+
+        Transactions are requested oldest-first (``ordering=id``) after the
+        last ingested transaction id (query parameter
+        ``biotime.transaction_id_param``). Paging on the id rather than on
+        punch_time keeps punches uploaded late by a terminal that was
+        offline, which get a new id but an old punch_time, and resumes
+        exactly where a run stopped at ``biotime.max_pages``.
 
-                new_checkin = min(existing.check_in, first_punch)
-                new_checkout = max(
-                    existing.check_out or last_punch,
-                    last_punch
+        The id filter keeps a ``start_time`` bound of
+        ``biotime.cursor_start_days`` (7, 0 = none) before the newest punch,
+        so a server ignoring the filter still pages from recent punches
+        instead of the oldest ones of its history. Punches uploaded later
+        than that are imported by a backfill.
+
+        Without a cursor the sync starts at the stored punch_time, if any,
+        else at today's midnight in the server timezone.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        page_size = int(ICP.get_param('biotime.page_size', 100))
+
+        query = {'ordering': 'id', 'page_size': page_size}
+        if server.last_transaction_id:
+            query[ICP.get_param('biotime.transaction_id_param', 'id__gt')] = server.last_transaction_id
+            start_days = int(ICP.get_param('biotime.cursor_start_days', 7))
+            if start_days > 0 and server.last_punch_time:
+                start_dt = datetime.strptime(server.last_punch_time, "%Y-%m-%d %H:%M:%S")
+                query['start_time'] = (start_dt - timedelta(days=start_days)).strftime("%Y-%m-%d %H:%M:%S")
+        elif server.last_punch_time:
+            query['start_time'] = server.last_punch_time
+        else:
+            query['start_time'] = datetime.combine(
+                datetime.now(server._get_tz()).date(), time(0, 0, 0)
+            ).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{server.base_url.rstrip('/')}/iclock/api/transactions/?{urlencode(query)}"
+
+    def _iter_new_transaction_pages(self, client, start_url, max_pages, cursor):
+        """Yield the transactions of each page newer than ``cursor['id']``.
+
+        ``cursor`` is updated in place with the newest transaction id and
+        punch_time seen, the number of pages read and whether more remain.
+        A failing page ends the stream; everything before it is still
+        ingested and the next run resumes from there.
+        """
+        pages = client.fetch_pages(start_url, max_pages)
+        while True:
+            try:
+                payload = next(pages)
+            except StopIteration:
+                break
+            except requests.exceptions.Timeout:
+                _logger.warning(f"BioTime API timed out on page {cursor['pages'] + 1}, stopping fetch")
+                self._stat('error_count')
+                break
+            except requests.exceptions.RequestException as e:
+                _logger.warning(f"BioTime API error on page {cursor['pages'] + 1}: {e}, stopping fetch")
+                self._stat('error_count')
+                break
+
+            data = payload.get("data", [])
+            if not data:
+                break
+
+            cursor['pages'] += 1
+            cursor['has_more'] = bool(payload.get("next"))
+            if 'total_pages' not in cursor:
+                cursor['total_pages'] = min(
+                    max_pages, -(-(payload.get("count") or 0) // len(data))
                 )
-                has_checkout = new_checkout != new_checkin
 
-                new_in_ist = pytz.UTC.localize(new_checkin).astimezone(ist).strftime("%H:%M")
-                new_out_ist = pytz.UTC.localize(new_checkout).astimezone(ist).strftime("%H:%M") if has_checkout else "None"
-                _logger.info(
-                    f"  → Will write: check_in={new_in_ist} check_out={new_out_ist} IST "
-                    f"no_checkout={not has_checkout}"
+            # pages are ordered by id: anything not above the running cursor
+            # was shifted from a previous page or the server ignored the id filter
+            new_data = [tx for tx in data if (tx.get("id") or 0) > cursor['id']]
+            if cursor['pages'] == 1 and cursor['id'] and not new_data:
+                # with a working id filter the first page only holds new ids
+                cursor['id_filter_ignored'] = True
+                _logger.warning(
+                    "BioTime returned only transactions up to the cursor on the first page: "
+                    "the id filter (biotime.transaction_id_param) seems unsupported"
                 )
+            data = new_data
+            for tx in data:
+                cursor['id'] = max(cursor['id'], tx["id"])
+                if tx.get("punch_time") and (
+                    not cursor['time'] or tx["punch_time"] > cursor['time']
+                ):
+                    cursor['time'] = tx["punch_time"]
 
-                try:
-                    with self.env.cr.savepoint():
-                        existing.write({
-                            'check_in': new_checkin,
-                            'check_out': new_checkout if has_checkout else False,
-                            'x_studio_no_checkout': not has_checkout,
-                        })
-                    attendance = existing
-                    _logger.info(f"  → Updated existing attendance ID {attendance.id} ✓")
-                except Exception:
-                    # Reset validated work entries, retry, then re-validate
-                    work_entries = self._reset_and_revalidate_work_entries(employee_id)
-                    try:
-                        with self.env.cr.savepoint():
-                            existing.write({
-                                'check_in': new_checkin,
-                                'check_out': new_checkout if has_checkout else False,
-                                'x_studio_no_checkout': not has_checkout,
-                            })
-                        attendance = existing
-                        _logger.info(f"  → Updated existing attendance ID {attendance.id} ✓ (after work entry reset)")
-                    except Exception as e2:
-                        _logger.warning(f"  → SKIPPED attendance ID {existing.id} even after reset: {e2}")
-                        attendance = existing
-                    finally:
-                        self._revalidate_work_entries(work_entries)
+            _logger.info(f"Page {cursor['pages']}: {len(data)} new transactions")
+            self._job_progress(
+                cursor['pages'] - 1, cursor['total_pages'],
+                f"Page {cursor['pages']} of {cursor['total_pages']}"
+            )
+            yield data
 
-            else:
+        pages.close()
 
-                _logger.info(f"  → No existing attendance found for Employee {employee_id} on {punch_date}")
-
-                # Close any open previous-day record before creating new one
-                open_prev = HrAttendance.search([
-                    ('employee_id', '=', employee_id),
-                    ('check_out', '=', False),
-                    ('check_in', '<', day_start_utc),
-                ], limit=1)
-
-                if open_prev:
-                    prev_checkin_ist = pytz.UTC.localize(
-                        open_prev.check_in
-                    ).astimezone(ist)
-                    prev_date = prev_checkin_ist.date()
-                    if prev_checkin_ist.time() < time(19, 0, 0):
-                        close_ist = ist.localize(
-                            datetime.combine(prev_date, time(19, 0, 0))
-                        )
-                    else:
-                        close_ist = prev_checkin_ist + timedelta(minutes=15)
-                    close_utc = close_ist.astimezone(pytz.UTC).replace(tzinfo=None)
+    # ------------------------------------------------
+    # PUSH
+    # ------------------------------------------------
 
-                    _logger.info(
-                        f"  → Open previous attendance ID {open_prev.id} found "
-                        f"(check_in={prev_checkin_ist.strftime('%Y-%m-%d %H:%M')} IST) — "
-                        f"will close at {close_ist.strftime('%H:%M')} IST"
-                    )
+    def _ingest_push(self, server, transactions):
+        """Import a batch of transactions pushed by ``server`` through the
+        same path as the polling sync. Returns the punch lines imported."""
+        return self._run_tracked('push', '_ingest_push_batch', server, transactions)
+
+    def _ingest_push_batch(self, server, transactions):
+        contended = {}
+        imported = self._ingest_transactions(transactions, server, contended)
+        skipped_ids = {p["tx_id"] for punches in contended.values() for p in punches}
+
+        # Move the polling cursor over pushed ids only while they directly
+        # follow it: a transaction lost by the push is then still fetched by
+        # the next poll, which only reads ids above the cursor.
+        last_id, last_time = server.last_transaction_id, server.last_punch_time
+        by_id = {tx["id"]: tx for tx in transactions if tx.get("id")}
+        while last_id + 1 in by_id and last_id + 1 not in skipped_ids:
+            last_id += 1
+            punch_time = by_id[last_id].get("punch_time")
+            if punch_time and (not last_time or punch_time > last_time):
+                last_time = punch_time
+        if last_id > server.last_transaction_id:
+            server.write({
+                'last_transaction_id': last_id,
+                'last_punch_time': last_time,
+            })
 
-                    try:
-                        with self.env.cr.savepoint():
-                            open_prev.write({
-                                'check_out': close_utc,
-                                'x_studio_no_checkout': True,
-                            })
-                        _logger.info(
-                            f"  → Auto-closed attendance ID {open_prev.id} "
-                            f"at {close_ist.strftime('%Y-%m-%d %H:%M')} IST ✓"
-                        )
-                    except Exception:
-                        work_entries = self._reset_and_revalidate_work_entries(employee_id)
-                        try:
-                            with self.env.cr.savepoint():
-                                open_prev.write({
-                                    'check_out': close_utc,
-                                    'x_studio_no_checkout': True,
-                                })
-                            _logger.info(
-                                f"  → Auto-closed attendance ID {open_prev.id} "
-                                f"at {close_ist.strftime('%Y-%m-%d %H:%M')} IST ✓ (after work entry reset)"
-                            )
-                        except Exception as e2:
-                            _logger.warning(f"  → SKIPPED closing attendance ID {open_prev.id} even after reset: {e2}")
-                        finally:
-                            self._revalidate_work_entries(work_entries)
-
-                has_checkout = len(punches) > 1 and last_punch != first_punch
-                first_ist = pytz.UTC.localize(first_punch).astimezone(ist).strftime("%H:%M")
-                last_ist = pytz.UTC.localize(last_punch).astimezone(ist).strftime("%H:%M")
-                _logger.info(
-                    f"  → Creating attendance: check_in={first_ist} "
-                    f"check_out={last_ist if has_checkout else 'None'} IST "
-                    f"no_checkout={not has_checkout}"
+        _logger.info(
+            f"Biotime push from {server.name}: {len(transactions)} received, "
+            f"{imported} imported, {len(skipped_ids)} left to polling (employee locked)"
+        )
+        return imported
+
+    def sync_attendance(self):
+        return self._run_servers('attendance', '_sync_attendance')
+
+    def _sync_attendance(self, server):
+
+        _logger.info(f"=== BIOTIME SYNC STARTED ({server.name}) ===")
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_pages = int(ICP.get_param('biotime.max_pages', 25))
+
+        last_id, last_time = server.last_transaction_id, server.last_punch_time
+        _logger.info(f"Resuming after transaction {last_id} ({last_time or 'no cursor'})")
+
+        start_url = self._get_transactions_start_url(server)
+
+        client = server._get_client()
+
+        # =====================================================
+        # 1️⃣ FETCH NEW PAGES (oldest first) AND INGEST AS THEY ARRIVE
+        # =====================================================
+        cursor = {'id': last_id, 'time': last_time, 'pages': 0, 'has_more': False}
+        pages = self._iter_new_transaction_pages(client, start_url, max_pages, cursor)
+        contended = {}
+        imported = self._ingest_pages(pages, server, contended)
+
+        if cursor.get('id_filter_ignored'):
+            if cursor['id'] <= last_id:
+                raise UserError(
+                    f"BioTime server {server.name} ignored the transaction id filter "
+                    f"(biotime.transaction_id_param) and returned no transaction after "
+                    f"{last_id} within {cursor['pages']} page(s)."
                 )
+            self._stat('error_count')
+
+        if contended:
+            # punches of employees held by another worker: keep the cursor
+            # before them so the next run imports them
+            skipped = [p for punches in contended.values() for p in punches]
+            tz = server._get_tz()
+            first_time = pytz.UTC.localize(
+                min(p["punch_time"] for p in skipped)
+            ).astimezone(tz).strftime("%Y-%m-%d %H:%M:%S")
+            cursor['id'] = min(cursor['id'], min(p["tx_id"] for p in skipped) - 1)
+            cursor['time'] = min(cursor['time'], first_time) if cursor['time'] else first_time
+            _logger.info(
+                f"{len(skipped)} punch(es) of {len({k[0] for k in contended})} "
+                f"employee(s) locked by another worker, left for the next run"
+            )
+
+        if cursor['has_more'] and cursor['pages'] >= max_pages:
+            _logger.info(
+                f"Stopped after {max_pages} pages, the next run resumes from the cursor"
+            )
+
+        _logger.info(f"Punch lines imported: {imported}")
+
+        # =====================================================
+        # 2️⃣ ADVANCE CURSOR (same transaction as the import)
+        # =====================================================
+        if cursor['id'] > last_id:
+            server.write({
+                'last_transaction_id': cursor['id'],
+                'last_punch_time': cursor['time'],
+            })
+            _logger.info(f"Cursor moved to transaction {cursor['id']} ({cursor['time']})")
+        else:
+            _logger.info("No transactions found.")
+
+        _logger.info(f"=== BIOTIME SYNC COMPLETED ({server.name}) ===")
+
+
+    def auto_close_at_nine_pm(self):
+        return self._run_tracked('auto_close', '_auto_close_at_nine_pm')
+
+    def _get_day_punch_summary(self, keys):
+        """Return {(employee_id, local date): (last punch_time, punch count)}
+        for the given keys, using one grouped query."""
+        if not keys:
+            return {}
+
+        self.env['hr.attendance.line'].flush_model()
+        self.env.cr.execute("""
+            SELECT employee_id,
+                   local_date,
+                   max(punch_time),
+                   count(*)
+              FROM hr_attendance_line
+             WHERE employee_id = ANY(%(employee_ids)s)
+               AND local_date = ANY(%(dates)s)
+          GROUP BY employee_id, local_date
+        """, {
+            'employee_ids': list({employee_id for employee_id, _ in keys}),
+            'dates': list({punch_date for _, punch_date in keys}),
+        })
+        return {
+            (employee_id, local_date): (last_punch, count)
+            for employee_id, local_date, last_punch, count in self.env.cr.fetchall()
+        }
+
+    def _write_in_batches(self, updates, batch_size=200):
+        """Apply {vals_key: [attendance ids]} writes, one write per distinct
+        value set, one savepoint per batch of records.
+
+        If a batch fails (e.g. a record locked by a validated work entry),
+        its records are retried one by one so only the locked ones are
+        skipped. Returns the number of records written.
+        """
+        written = 0
+        for vals_key, attendance_ids in updates.items():
+            vals = dict(vals_key)
+            records = self.env['hr.attendance'].browse(attendance_ids)
+            for i in range(0, len(records), batch_size):
+                batch = records[i:i + batch_size]
                 try:
                     with self.env.cr.savepoint():
-                        attendance = HrAttendance.create({
-                            'employee_id': employee_id,
-                            'check_in': first_punch,
-                            'check_out': last_punch if has_checkout else False,
-                            'x_studio_no_checkout': not has_checkout,
-                        })
-                    _logger.info(f"  → Created attendance ID {attendance.id} ✓")
+                        batch.write(vals)
+                    written += len(batch)
+                    continue
                 except Exception:
-                    work_entries = self._reset_and_revalidate_work_entries(employee_id)
+                    pass
+
+                for att in batch:
                     try:
                         with self.env.cr.savepoint():
-                            attendance = HrAttendance.create({
-                                'employee_id': employee_id,
-                                'check_in': first_punch,
-                                'check_out': last_punch if has_checkout else False,
-                                'x_studio_no_checkout': not has_checkout,
-                            })
-                        _logger.info(f"  → Created attendance ID {attendance.id} ✓ (after work entry reset)")
-                    except Exception as e2:
+                            att.write(vals)
+                        written += 1
+                    except Exception as e:
                         _logger.warning(
-                            f"  → SKIPPED creating attendance for Employee {employee_id} on {punch_date} "
-                            f"even after work entry reset: {e2}"
+                            f"Skipped attendance ID {att.id} (locked by validated work entry): {e}"
                         )
-                        self._revalidate_work_entries(work_entries)
-                        continue
-                    finally:
-                        self._revalidate_work_entries(work_entries)
-
-            # -----------------------------------------------
-            # CREATE PUNCH LINES
-            # -----------------------------------------------
-            for p in punches:
-
-                p_ist = pytz.UTC.localize(p["punch_time"]).astimezone(ist).strftime("%H:%M")
-                if HrAttendanceLine.search(
-                    [('biotime_transaction_id', '=', p["tx_id"])],
-                    limit=1
-                ):
-                    _logger.info(f"  → Punch line tx_id={p['tx_id']} ({p_ist} IST) already exists, skipping")
-                    continue
-    
-                HrAttendanceLine.create({
-                    'attendance_id': attendance.id,
-                    'employee_id': employee_id,
-                    'punch_time': p["punch_time"],
-                    'punch_state': False,
-                    'terminal_sn': p["terminal_sn"],
-                    'terminal_alias': p["terminal_alias"],
-                    'biotime_transaction_id': p["tx_id"],
-                })
-                _logger.info(f"  → Punch line created: tx_id={p['tx_id']} ({p_ist} IST)")
-
-            _logger.info(
-                f"  === Done Employee {employee_id} {punch_date} ==="
-            )
-    
-        _logger.info("=== BIOTIME SYNC COMPLETED ===")
+                        self._stat('error_count')
+        return written
 
+    def _auto_close_at_nine_pm(self):
 
-    def auto_close_at_nine_pm(self):
-    
-        _logger = logging.getLogger(__name__)
         _logger.info("=== AUTO CLOSE ATTENDANCE STARTED ===")
-    
+
         HrAttendance = self.env['hr.attendance']
-        HrAttendanceLine = self.env['hr.attendance.line']
-    
-        ist = pytz.timezone("Asia/Kolkata")
-    
-        now_ist = datetime.now(ist)
-        today_ist = now_ist.date()
-    
+
+        default_tz = self._get_tz()
+
         open_attendances = HrAttendance.search([
             ('check_out', '=', False),
             ('check_in', '!=', False),
         ])
-    
+
         _logger.info(f"Open attendances found: {len(open_attendances)}")
-    
+
+        # --------------------------------------------------
+        # Previous days open → close now; today open → close after 7 PM,
+        # both in the timezone of the server the attendance comes from
+        # --------------------------------------------------
+        now_by_tz = {}
+        to_close = []
         for att in open_attendances:
-    
-            checkin_utc = fields.Datetime.to_datetime(att.check_in)
-            checkin_ist = pytz.UTC.localize(checkin_utc).astimezone(ist)
-    
-            attendance_date = checkin_ist.date()
-    
-            # --------------------------------------------------
-            # CASE 1: Previous day open → close immediately
-            # --------------------------------------------------
-            if attendance_date < today_ist:
+            ist = att.biotime_server_id._get_tz() if att.biotime_server_id else default_tz
+            if ist.zone not in now_by_tz:
+                now_by_tz[ist.zone] = datetime.now(ist)
+            now_ist = now_by_tz[ist.zone]
+            if att.local_date < now_ist.date() or (
+                att.local_date == now_ist.date() and now_ist.time() >= time(19, 0, 0)
+            ):
+                checkin_ist = pytz.UTC.localize(att.check_in).astimezone(ist)
+                to_close.append((att, checkin_ist, ist))
 
-                _logger.info(f"Closing previous day attendance ID {att.id}")
+        # employees being written by a sync are closed by the next run
+        locked = self._lock_employees({item[0].employee_id.id for item in to_close})
+        self._stat('lock_skipped', sum(1 for item in to_close if item[0].employee_id.id not in locked))
+        to_close = [item for item in to_close if item[0].employee_id.id in locked]
 
-                day_start = datetime.combine(attendance_date, time(0, 0, 0))
-                day_end = datetime.combine(attendance_date, time(23, 59, 59))
-                lines = HrAttendanceLine.search([
-                    ('employee_id', '=', att.employee_id.id),
-                    ('punch_time', '>=', day_start),
-                    ('punch_time', '<=', day_end),
-                ], order="punch_time asc")
+        with self._timed('db_time'):
+            summary = self._get_day_punch_summary(
+                {(att.employee_id.id, att.local_date) for att, _checkin_ist, _ist in to_close}
+            )
+
+            updates = {}
+            for att, checkin_ist, ist in to_close:
+                attendance_date = att.local_date
+                last_punch, punch_count = summary.get(
+                    (att.employee_id.id, attendance_date), (False, 0)
+                )
 
-                if lines and len(lines) > 1:
+                if punch_count > 1:
                     # Multiple punches → last punch is checkout
-                    checkout_time = lines[-1].punch_time
+                    checkout_time = last_punch
                     no_checkout_flag = False
                 else:
                     # Single punch or no lines → decide by check_in time
@@ -755,85 +1461,42 @@ class BiotimeService(models.Model):
                     no_checkout_flag = True
 
                 if checkout_time > att.check_in:
-                    try:
-                        with self.env.cr.savepoint():
-                            att.write({
-                                'check_out': checkout_time,
-                                'x_studio_no_checkout': no_checkout_flag,
-                            })
-                        _logger.info(
-                            f"Closed attendance {att.id} at {checkout_time}"
-                        )
-                    except Exception as e:
-                        _logger.warning(
-                            f"Skipped attendance ID {att.id} (locked by validated work entry): {e}"
-                        )
-
-            # --------------------------------------------------
-            # CASE 2: Today open AND time > 9 PM → auto close
-            # --------------------------------------------------
-            elif attendance_date == today_ist:
+                    key = (('check_out', checkout_time), ('x_studio_no_checkout', no_checkout_flag))
+                    updates.setdefault(key, []).append(att.id)
 
-                if now_ist.time() >= time(19, 0, 0):
+            closed = self.with_context(biotime_employee_locked=True)._write_in_batches(updates)
 
-                    _logger.info(f"9PM auto close for attendance ID {att.id}")
+        self._stat('attendance_updated', closed)
+        _logger.info(f"Closed {closed} of {len(to_close)} attendance(s) due for closing")
+        _logger.info("=== AUTO CLOSE ATTENDANCE COMPLETED ===")
 
-                    day_start = datetime.combine(attendance_date, time(0, 0, 0))
-                    day_end = datetime.combine(attendance_date, time(23, 59, 59))
-                    lines = HrAttendanceLine.search([
-                        ('employee_id', '=', att.employee_id.id),
-                        ('punch_time', '>=', day_start),
-                        ('punch_time', '<=', day_end),
-                    ], order="punch_time asc")
 
-                    if lines and len(lines) > 1:
-                        checkout_time = lines[-1].punch_time
-                        no_checkout_flag = False
-                    else:
-                        if checkin_ist.time() < time(19, 0, 0):
-                            close_ist = ist.localize(
-                                datetime.combine(attendance_date, time(19, 0, 0))
-                            )
-                        else:
-                            close_ist = checkin_ist + timedelta(minutes=15)
-                        checkout_time = close_ist.astimezone(pytz.UTC).replace(tzinfo=None)
-                        no_checkout_flag = True
-
-                    if checkout_time > att.check_in:
-                        try:
-                            with self.env.cr.savepoint():
-                                att.write({
-                                    'check_out': checkout_time,
-                                    'x_studio_no_checkout': no_checkout_flag,
-                                })
-                            _logger.info(
-                                f"11PM closed attendance {att.id}"
-                            )
-                        except Exception as e:
-                            _logger.warning(
-                                f"Skipped attendance ID {att.id} (locked by validated work entry): {e}"
-                            )
-    
-        _logger.info("=== AUTO CLOSE ATTENDANCE COMPLETED ===")
-    
 
 
+    # Control panel buttons queue a biotime.job drained by a cron worker,
+    # so the sync does not run inside the HTTP request.
 
     def action_sync_terminals(self):
-        self.sync_terminals()
-        return True
+        return self.env['biotime.job']._enqueue('terminals')._action_open()
     
     def action_sync_biodata(self):
-        self.sync_biodata()
-        return True
+        return self.env['biotime.job']._enqueue('biodata')._action_open()
     
     def action_sync_attendance(self):
-        self.sync_attendance()
-        return True
+        return self.env['biotime.job']._enqueue('attendance')._action_open()
     
     def action_manual_close(self):
-        self.auto_close_at_nine_pm()
-        return True
+        return self.env['biotime.job']._enqueue('auto_close')._action_open()
+
+    def action_open_jobs(self):
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'l4e_biotime_connector.action_biotime_job'
+        )
+
+    def action_open_sync_runs(self):
+        return self.env['ir.actions.act_window']._for_xml_id(
+            'l4e_biotime_connector.action_biotime_sync_run'
+        )
 
 
 
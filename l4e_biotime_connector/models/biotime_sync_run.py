@@ -0,0 +1,66 @@
+from odoo import models, fields, api
+
+
+class BiotimeSyncRun(models.Model):
+    _name = "biotime.sync.run"
+    _description = "Biotime Sync Run"
+    _order = "date_start desc, id desc"
+    _rec_name = "date_start"
+
+    sync_type = fields.Selection([
+        ('attendance', 'Attendance'),
+        ('terminals', 'Terminals'),
+        ('biodata', 'Biodata'),
+        ('auto_close', 'Auto Close'),
+        ('push', 'Push'),
+    ], required=True, index=True)
+    server_id = fields.Many2one("biotime.server", ondelete="set null", index=True)
+    state = fields.Selection([
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='running', index=True)
+
+    date_start = fields.Datetime(default=fields.Datetime.now, index=True)
+    date_end = fields.Datetime()
+    duration = fields.Float(string="Duration (s)", aggregator="avg")
+
+    pages_fetched = fields.Integer()
+    pages_unchanged = fields.Integer()
+    http_time = fields.Float(string="HTTP Time (s)")
+    db_time = fields.Float(string="DB Time (s)")
+
+    tx_seen = fields.Integer(string="Transactions Seen")
+    tx_skipped = fields.Integer(string="Transactions Skipped")
+    tx_imported = fields.Integer(string="Transactions Imported")
+
+    attendance_created = fields.Integer()
+    attendance_updated = fields.Integer()
+    work_entry_resets = fields.Integer()
+    lock_skipped = fields.Integer(
+        string="Skipped (Locked)",
+        help="Punches or attendances left for a later run because their "
+             "employee was locked by another worker."
+    )
+
+    unknown_code_count = fields.Integer(string="Unknown Codes")
+    unknown_codes = fields.Text(
+        help="BioTime employee codes matching no employee, with the number "
+             "of transactions or biodata skipped for each."
+    )
+
+    error_count = fields.Integer(string="Errors")
+    error_message = fields.Text()
+
+    @api.model
+    def _stats_to_vals(self, stats):
+        """Map the run counters collected by biotime.service to field values."""
+        return {
+            fname: stats.get(fname, 0)
+            for fname in (
+                'pages_fetched', 'pages_unchanged', 'http_time', 'db_time',
+                'tx_seen', 'tx_skipped', 'tx_imported',
+                'attendance_created', 'attendance_updated',
+                'work_entry_resets', 'lock_skipped', 'error_count',
+            )
+        }
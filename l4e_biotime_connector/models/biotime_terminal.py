@@ -5,7 +5,14 @@ class BiotimeTerminal(models.Model):
     _description = "Biotime Terminal"
     _rec_name = "terminal_name"
 
+    server_id = fields.Many2one(
+        "biotime.server",
+        ondelete="cascade",
+        index=True
+    )
     biotime_id = fields.Integer(index=True)
+    # hash of the last imported API payload, to skip unchanged rows
+    payload_hash = fields.Char(copy=False)
     sn = fields.Char()
     ip_address = fields.Char()
     alias = fields.Char()
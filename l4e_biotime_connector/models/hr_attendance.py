@@ -1,4 +1,7 @@
-from odoo import models, fields
+import pytz
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
 
 class HrAttendance(models.Model):
     _inherit = "hr.attendance"
@@ -8,3 +11,145 @@ class HrAttendance(models.Model):
         "attendance_id",
         string="Biometric Punches"
     )
+
+    # BioTime instance whose punches opened this attendance
+    biotime_server_id = fields.Many2one(
+        "biotime.server",
+        string="Biotime Server",
+        ondelete="set null"
+    )
+    # check_in date in the Biotime timezone, for exact per-day lookups
+    local_date = fields.Date(
+        compute="_compute_local_date",
+        store=True,
+        index=True
+    )
+
+    # summary kept when the punch lines are moved to the archive
+    biotime_first_punch = fields.Datetime(string="First Punch", readonly=True)
+    biotime_last_punch = fields.Datetime(string="Last Punch", readonly=True)
+    biotime_archived_punch_count = fields.Integer(string="Archived Punches", readonly=True)
+    biotime_punch_count = fields.Integer(
+        string="Punches",
+        compute="_compute_biotime_punch_count"
+    )
+
+    _employee_local_date_idx = models.Index("(employee_id, local_date)")
+
+    @api.depends('check_in', 'biotime_server_id.tz')
+    def _compute_local_date(self):
+        default_tz = self.env['biotime.service']._get_tz()
+        for rec in self:
+            tz = rec.biotime_server_id._get_tz() if rec.biotime_server_id else default_tz
+            rec.local_date = (
+                pytz.UTC.localize(rec.check_in).astimezone(tz).date()
+                if rec.check_in else False
+            )
+
+    @api.depends('attendance_line_ids', 'biotime_archived_punch_count')
+    def _compute_biotime_punch_count(self):
+        for rec in self:
+            rec.biotime_punch_count = len(rec.attendance_line_ids) + rec.biotime_archived_punch_count
+
+    @api.model
+    def _attendance_days_changed(self, days):
+        """Hook called once per ingestion flush with the set of
+        ``(employee_id, local_date)`` whose attendances the Biotime sync
+        wrote, for modules depending on attendances (e.g. payroll) to react
+        in one go. Overrides collect their own per-record reactions in the
+        ``attendance_changed_days`` context set while it is present."""
+
+    @api.model
+    def _get_daily_totals(self, employee_ids, date_from, date_to):
+        """Return ``{employee_id: {local_date: {'hours', 'check_in',
+        'check_out'}}}``: worked hours, first check-in and last check-out
+        (UTC) of every employee and local day between two dates.
+
+        One SQL ``GROUP BY`` on the stored local_date, the check-in date in
+        the timezone of the attendance, instead of reading every record.
+        ``employee_ids`` None means all employees.
+        """
+        self.flush_model(['employee_id', 'local_date', 'check_in', 'check_out', 'worked_hours'])
+        employee_clause = ""
+        params = {'date_from': date_from, 'date_to': date_to}
+        if employee_ids is not None:
+            employee_clause = "AND employee_id = ANY(%(employee_ids)s)"
+            params['employee_ids'] = list(employee_ids)
+
+        self.env.cr.execute(f"""
+            SELECT employee_id,
+                   local_date,
+                   COALESCE(sum(worked_hours), 0),
+                   min(check_in),
+                   max(check_out)
+              FROM hr_attendance
+             WHERE local_date BETWEEN %(date_from)s AND %(date_to)s
+               {employee_clause}
+          GROUP BY employee_id, local_date
+        """, params)
+
+        totals = {}
+        for employee_id, local_date, hours, check_in, check_out in self.env.cr.fetchall():
+            totals.setdefault(employee_id, {})[local_date] = {
+                'hours': hours,
+                'check_in': check_in,
+                'check_out': check_out,
+            }
+        return totals
+
+    @api.model
+    def _get_worked_hours_map(self, employee_ids, date_from, date_to):
+        """Return ``{employee_id: {local_date: worked hours}}``; see
+        :meth:`_get_daily_totals`."""
+        return {
+            employee_id: {day: vals['hours'] for day, vals in days.items()}
+            for employee_id, days in self._get_daily_totals(employee_ids, date_from, date_to).items()
+        }
+
+    def action_view_punches(self):
+        """Punch lines of the attendance, live ones or archived ones."""
+        self.ensure_one()
+        archived = not self.attendance_line_ids and self.biotime_archived_punch_count
+        return {
+            'type': 'ir.actions.act_window',
+            'name': "Archived Punches" if archived else "Biometric Punches",
+            'res_model': "hr.attendance.line.archive" if archived else "hr.attendance.line",
+            'view_mode': 'list,form',
+            'domain': [('attendance_id', '=', self.id)],
+        }
+
+    # ------------------------------------------------
+    # LOCKING AGAINST BIOTIME SYNCS
+    # ------------------------------------------------
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._check_biotime_lock({vals['employee_id'] for vals in vals_list if vals.get('employee_id')})
+        return super().create(vals_list)
+
+    def write(self, vals):
+        employee_ids = set(self.employee_id.ids)
+        if vals.get('employee_id'):
+            employee_ids.add(vals['employee_id'])
+        self._check_biotime_lock(employee_ids)
+        return super().write(vals)
+
+    def unlink(self):
+        self._check_biotime_lock(set(self.employee_id.ids))
+        return super().unlink()
+
+    def _check_biotime_lock(self, employee_ids):
+        """Refuse changes to attendances of employees a BioTime sync is
+        writing. Takes the employee locks for the rest of the transaction,
+        so a sync started meanwhile leaves these employees for its next run.
+        Syncs holding the locks themselves pass ``biotime_employee_locked``.
+        """
+        if self.env.context.get('biotime_employee_locked') or not employee_ids:
+            return
+        locked = self.env['biotime.service']._lock_employees(employee_ids)
+        busy = self.env['hr.employee'].browse(set(employee_ids) - locked)
+        if busy:
+            raise UserError(
+                f"Attendances of {', '.join(busy.mapped('name'))} are being "
+                f"synchronised from BioTime. Please try again in a moment."
+            )
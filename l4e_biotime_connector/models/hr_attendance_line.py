@@ -1,6 +1,12 @@
 
+import logging
+from datetime import datetime, timedelta, time
+
+import pytz
+
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
 
 
 class HrAttendanceLine(models.Model):
@@ -18,6 +24,12 @@ class HrAttendanceLine(models.Model):
     )
 
     punch_time = fields.Datetime(required=True)
+    # punch_time date in the Biotime timezone, for exact per-day lookups
+    local_date = fields.Date(
+        compute="_compute_local_date",
+        store=True,
+        index=True
+    )
     punch_state = fields.Selection([
         ('0', 'IN'),
         ('1', 'OUT'),
@@ -26,89 +38,216 @@ class HrAttendanceLine(models.Model):
     terminal_sn = fields.Char()
     terminal_alias = fields.Char()
 
+    # BioTime instance the punch was imported from
+    server_id = fields.Many2one(
+        "biotime.server",
+        string="Biotime Server",
+        ondelete="restrict"
+    )
+    # transaction ids are only unique within one server;
+    # indexed by the unique constraint below
     biotime_transaction_id = fields.Integer(
         required=True,
-        index=True
     )
 
     # ------------------------------------------------
-    # ORM-level constraint (Odoo 19)
+    # Database-level constraint (Odoo 19)
     # ------------------------------------------------
-    @api.constrains('biotime_transaction_id')
-    def _check_unique_biotime_transaction(self):
+    _biotime_transaction_uniq = models.Constraint(
+        'UNIQUE(server_id, biotime_transaction_id)',
+        "This Biotime transaction is already imported.",
+    )
+    _employee_local_date_idx = models.Index("(employee_id, local_date)")
+
+    @api.depends('punch_time', 'server_id.tz')
+    def _compute_local_date(self):
+        default_tz = self.env['biotime.service']._get_tz()
         for rec in self:
-            if not rec.biotime_transaction_id:
-                continue
+            tz = rec.server_id._get_tz() if rec.server_id else default_tz
+            rec.local_date = (
+                pytz.UTC.localize(rec.punch_time).astimezone(tz).date()
+                if rec.punch_time else False
+            )
 
-            count = self.search_count([
-                ('biotime_transaction_id', '=', rec.biotime_transaction_id),
-                ('id', '!=', rec.id),
-            ])
+    @api.model
+    def _create_ignore_duplicates(self, vals_list):
+        """Insert punch lines, silently skipping transactions already stored.
+
+        Uses ``INSERT ... ON CONFLICT DO NOTHING`` on the unique
+        (server_id, biotime_transaction_id), so overlapping sync workers
+        cannot import a punch twice and no validation query is run per line.
+        ``local_date`` is taken from the values when given (the caller knows
+        the server timezone), else computed with the default timezone.
+        Returns the inserted records.
+        """
+        if not vals_list:
+            return self.browse()
 
-            if count:
-                raise ValidationError(
-                    "This Biotime transaction is already imported."
+        self.env.flush_all()
+        self.env.cr.execute("""
+            INSERT INTO hr_attendance_line (
+                attendance_id, employee_id, punch_time, local_date, punch_state,
+                terminal_sn, terminal_alias, server_id, biotime_transaction_id,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT v.attendance_id, v.employee_id, v.punch_time,
+                   COALESCE(
+                       v.local_date,
+                       (v.punch_time AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)::date
+                   ),
+                   v.punch_state,
+                   v.terminal_sn, v.terminal_alias, v.server_id, v.biotime_transaction_id,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM unnest(
+                       %(attendance_id)s::int[], %(employee_id)s::int[],
+                       %(punch_time)s::timestamp[], %(local_date)s::date[],
+                       %(punch_state)s::varchar[],
+                       %(terminal_sn)s::varchar[], %(terminal_alias)s::varchar[],
+                       %(server_id)s::int[], %(biotime_transaction_id)s::int[]
+                   ) AS v(attendance_id, employee_id, punch_time, local_date, punch_state,
+                          terminal_sn, terminal_alias, server_id, biotime_transaction_id)
+            ON CONFLICT (server_id, biotime_transaction_id) DO NOTHING
+            RETURNING id
+        """, {
+            'uid': self.env.uid,
+            'tz': self.env['biotime.service']._get_tz().zone,
+            **{
+                fname: [vals.get(fname) or None for vals in vals_list]
+                for fname in (
+                    'attendance_id', 'employee_id', 'punch_time', 'local_date',
+                    'punch_state', 'terminal_sn', 'terminal_alias',
+                    'server_id', 'biotime_transaction_id',
                 )
+            },
+        })
+        lines = self.browse(row[0] for row in self.env.cr.fetchall())
+        self.env['hr.attendance'].invalidate_model(['attendance_line_ids'])
+        return lines
 
 
     def _recompute_attendance_from_lines(self, employee_id, date):
-        HrAttendance = self.env['hr.attendance']
-        HrAttendanceLine = self.env['hr.attendance.line']
-    
-        start_dt = datetime.combine(date, datetime.min.time())
-        end_dt = datetime.combine(date, datetime.max.time())
-    
-        lines = HrAttendanceLine.search([
-            ('employee_id', '=', employee_id),
-            ('punch_time', '>=', start_dt),
-            ('punch_time', '<=', end_dt),
-        ], order="punch_time asc")
-    
-        if not lines:
+        self._recompute_attendance(date, date, employee_ids=[employee_id])
+
+    @api.model
+    def _recompute_attendance(self, date_from, date_to, employee_ids=None):
+        """Rebuild hr.attendance from punch lines between two local dates.
+
+        First/last punch per employee and local day come from one SQL
+        ``GROUP BY``; attendances of the window are loaded with one search,
+        missing ones are created with one multi-create, and punch lines are
+        linked with one UPDATE. The employees are locked against concurrent
+        syncs first (see ``biotime.service._lock_employees``).
+        """
+        Service = self.env['biotime.service']
+        HrAttendance = self.env['hr.attendance'].with_context(biotime_employee_locked=True)
+        if employee_ids:
+            Service._lock_employees(employee_ids, wait=True)
+
+        employee_clause = ""
+        params = {'date_from': date_from, 'date_to': date_to}
+        if employee_ids:
+            employee_clause = "AND employee_id = ANY(%(employee_ids)s)"
+            params['employee_ids'] = list(employee_ids)
+
+        self.env.flush_all()
+        self.env.cr.execute(f"""
+            SELECT employee_id,
+                   local_date,
+                   min(punch_time),
+                   max(punch_time),
+                   count(*),
+                   max(server_id)
+              FROM hr_attendance_line
+             WHERE local_date BETWEEN %(date_from)s AND %(date_to)s
+               {employee_clause}
+          GROUP BY employee_id, local_date
+        """, params)
+        rows = self.env.cr.fetchall()
+        if not rows:
             return
-    
-        check_in = lines[0].punch_time
-        check_out = lines[-1].punch_time if len(lines) > 1 else False
-    
-        attendance = HrAttendance.search([
-            ('employee_id', '=', employee_id),
-            ('check_in', '>=', start_dt),
-            ('check_in', '<=', end_dt),
-        ], limit=1)
-    
-        vals = {
-            'employee_id': employee_id,
-            'check_in': check_in,
-            'check_out': check_out if check_out and check_out > check_in else False,
-            'x_studio_no_checkout': False if check_out else True,
-        }
-    
-        if attendance:
-            attendance.write(vals)
-        else:
-            attendance = HrAttendance.create(vals)
-    
-        # link lines
-        lines.write({'attendance_id': attendance.id})
-    
+        if not employee_ids:
+            # punches written meanwhile were applied by their own sync
+            Service._lock_employees({row[0] for row in rows}, wait=True)
+
+        # -----------------------------------------------
+        # EXISTING ATTENDANCES OF THE WINDOW (one search)
+        # -----------------------------------------------
+        attendances = HrAttendance.search([
+            ('employee_id', 'in', list({row[0] for row in rows})),
+            ('local_date', '>=', date_from),
+            ('local_date', '<=', date_to),
+        ])
+        existing = {}
+        # ordered by check_in desc, like the former search(limit=1)
+        for att in attendances:
+            existing.setdefault((att.employee_id.id, att.local_date), att)
+
+        to_create = []
+        create_keys = []
+        attendance_ids = {}
+        for employee_id, local_date, check_in, check_out, count, server_id in rows:
+            vals = {
+                'employee_id': employee_id,
+                'check_in': check_in,
+                'check_out': check_out if count > 1 and check_out > check_in else False,
+                'x_studio_no_checkout': count <= 1,
+            }
+            attendance = existing.get((employee_id, local_date))
+            if not attendance:
+                to_create.append(dict(vals, biotime_server_id=server_id))
+                create_keys.append((employee_id, local_date))
+                continue
+
+            attendance_ids[(employee_id, local_date)] = attendance.id
+            if (
+                attendance.check_in != vals['check_in']
+                or (attendance.check_out or False) != vals['check_out']
+                or attendance.x_studio_no_checkout != vals['x_studio_no_checkout']
+            ):
+                attendance.write(vals)
+
+        if to_create:
+            created = HrAttendance.create(to_create)
+            attendance_ids.update(zip(create_keys, created.ids))
+
+        # -----------------------------------------------
+        # LINK LINES (one UPDATE)
+        # -----------------------------------------------
+        self.env.flush_all()
+        keys = list(attendance_ids)
+        self.env.cr.execute("""
+            UPDATE hr_attendance_line l
+               SET attendance_id = m.attendance_id
+              FROM unnest(%(employee_ids)s::int[], %(dates)s::date[], %(attendance_ids)s::int[])
+                   AS m(employee_id, local_date, attendance_id)
+             WHERE l.employee_id = m.employee_id
+               AND l.local_date = m.local_date
+               AND l.attendance_id IS DISTINCT FROM m.attendance_id
+        """, {
+            'employee_ids': [k[0] for k in keys],
+            'dates': [k[1] for k in keys],
+            'attendance_ids': [attendance_ids[k] for k in keys],
+        })
+        self.invalidate_model(['attendance_id'])
+        HrAttendance.invalidate_model(['attendance_line_ids'])
+
+        _logger.info(
+            f"Recomputed {len(rows)} attendance day(s) from punches "
+            f"{date_from} → {date_to}: {len(to_create)} created"
+        )
+
     @api.model
-    def cron_recompute_all_attendance(self):
-        HrAttendanceLine = self.env['hr.attendance.line']
-    
-        lines = HrAttendanceLine.search([])
-    
-        grouped = {}
-    
-        for line in lines:
-            date = line.punch_time.date()
-            grouped.setdefault(
-                (line.employee_id.id, date),
-                []
-            ).append(line)
-    
-        for (employee_id, date), _ in grouped.items():
-            self._recompute_attendance_from_lines(employee_id, date)
-
-    
-    
+    def cron_recompute_all_attendance(self, date_from=None, date_to=None):
+        """Recompute attendances from punches, bounded to a date window.
 
+        Defaults to the last ``biotime.recompute_days`` (7) local days
+        instead of the whole punch history.
+        """
+        if not date_to:
+            date_to = datetime.now(self.env['biotime.service']._get_tz()).date()
+        if not date_from:
+            days = int(self.env['ir.config_parameter'].sudo().get_param(
+                'biotime.recompute_days', 7
+            ))
+            date_from = date_to - timedelta(days=days - 1)
+        self._recompute_attendance(date_from, date_to)
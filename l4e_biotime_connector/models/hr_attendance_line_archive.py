@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class HrAttendanceLineArchive(models.Model):
+    """Punch lines moved out of hr.attendance.line once older than the
+    archive horizon. Same columns, no audit fields and no computed ones,
+    so the live table only holds recent punches and stays small."""
+
+    _name = "hr.attendance.line.archive"
+    _description = "Biotime Archived Attendance Punch"
+    _order = "punch_time desc, id desc"
+    _log_access = False
+
+    attendance_id = fields.Many2one(
+        "hr.attendance",
+        ondelete="set null",
+        index="btree_not_null"
+    )
+    employee_id = fields.Many2one(
+        "hr.employee",
+        required=True,
+        readonly=True
+    )
+    punch_time = fields.Datetime(required=True, readonly=True)
+    local_date = fields.Date(readonly=True)
+    punch_state = fields.Selection([
+        ('0', 'IN'),
+        ('1', 'OUT'),
+    ], readonly=True)
+    terminal_sn = fields.Char(readonly=True)
+    terminal_alias = fields.Char(readonly=True)
+    server_id = fields.Many2one(
+        "biotime.server",
+        string="Biotime Server",
+        ondelete="restrict",
+        readonly=True
+    )
+    biotime_transaction_id = fields.Integer(required=True, readonly=True)
+    archive_date = fields.Date(readonly=True)
+
+    _biotime_transaction_uniq = models.Constraint(
+        'UNIQUE(server_id, biotime_transaction_id)',
+        "This Biotime transaction is already archived.",
+    )
+    _employee_local_date_idx = models.Index("(employee_id, local_date)")
+
+    # ------------------------------------------------
+    # ARCHIVING
+    # ------------------------------------------------
+
+    @api.model
+    def _get_archive_cutoff(self):
+        """First local date kept in the live table, or None when archiving
+        is disabled (``biotime.line_archive_months`` = 0)."""
+        months = int(self.env['ir.config_parameter'].sudo().get_param(
+            'biotime.line_archive_months', 12
+        ))
+        if months <= 0:
+            return None
+        today = datetime.now(self.env['biotime.service']._get_tz()).date()
+        return today.replace(day=1) - relativedelta(months=months)
+
+    @api.model
+    def cron_archive_lines(self, batch_size=None):
+        """Move punch lines of local dates before the archive horizon to the
+        archive, one committed batch at a time.
+
+        Whole months are moved, so a day is never split between the live
+        table and the archive. Before its lines leave, every attendance gets
+        its first/last punch and punch count stored (see
+        :meth:`_archive_batch`).
+        """
+        cutoff = self._get_archive_cutoff()
+        if not cutoff:
+            return 0
+        batch_size = batch_size or int(self.env['ir.config_parameter'].sudo().get_param(
+            'biotime.line_archive_batch', 50000
+        ))
+
+        total = 0
+        while True:
+            moved = self._archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            self.env.cr.commit()
+            _logger.info(f"Archived {total} punch line(s) before {cutoff}")
+        return total
+
+    @api.model
+    def _archive_batch(self, cutoff, limit):
+        """Move up to ``limit`` live punch lines older than ``cutoff`` with
+        one SQL statement and return how many were moved.
+
+        The attendance summary is merged with LEAST/GREATEST and a running
+        count, since the lines of one attendance can span batches.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            WITH batch AS (
+                SELECT id
+                  FROM hr_attendance_line
+                 WHERE local_date < %(cutoff)s
+              ORDER BY id
+                 LIMIT %(limit)s
+                   FOR UPDATE SKIP LOCKED
+            ), moved AS (
+                DELETE FROM hr_attendance_line l
+                 USING batch
+                 WHERE l.id = batch.id
+             RETURNING l.attendance_id, l.employee_id, l.punch_time, l.local_date,
+                       l.punch_state, l.terminal_sn, l.terminal_alias,
+                       l.server_id, l.biotime_transaction_id
+            ), summary AS (
+                UPDATE hr_attendance a
+                   SET biotime_first_punch = LEAST(a.biotime_first_punch, s.first_punch),
+                       biotime_last_punch = GREATEST(a.biotime_last_punch, s.last_punch),
+                       biotime_archived_punch_count = COALESCE(a.biotime_archived_punch_count, 0) + s.punch_count
+                  FROM (
+                        SELECT attendance_id,
+                               min(punch_time) AS first_punch,
+                               max(punch_time) AS last_punch,
+                               count(*) AS punch_count
+                          FROM moved
+                         WHERE attendance_id IS NOT NULL
+                      GROUP BY attendance_id
+                       ) s
+                 WHERE a.id = s.attendance_id
+            ), archived AS (
+                INSERT INTO hr_attendance_line_archive (
+                    attendance_id, employee_id, punch_time, local_date,
+                    punch_state, terminal_sn, terminal_alias,
+                    server_id, biotime_transaction_id, archive_date
+                )
+                SELECT attendance_id, employee_id, punch_time, local_date,
+                       punch_state, terminal_sn, terminal_alias,
+                       server_id, biotime_transaction_id, CURRENT_DATE
+                  FROM moved
+                    ON CONFLICT (server_id, biotime_transaction_id) DO NOTHING
+            )
+            SELECT count(*) FROM moved
+        """, {'cutoff': cutoff, 'limit': limit})
+        moved = self.env.cr.fetchone()[0]
+        if moved:
+            self.env['hr.attendance.line'].invalidate_model()
+            self.env['hr.attendance'].invalidate_model([
+                'attendance_line_ids', 'biotime_first_punch',
+                'biotime_last_punch', 'biotime_archived_punch_count',
+            ])
+        return moved
@@ -1,9 +1,90 @@
-from odoo import models, fields
+import logging
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# employee fields holding BioTime codes; changing them resets the code map
+BIOTIME_CODE_FIELDS = ('x_studio_emp_id', 'biotime_emp_code')
+
+
+def normalize_emp_code(value):
+    """BioTime employee code of ``value``: the first word, so the
+    ``"CODE Name"`` form used by biodata resolves like a plain code."""
+    words = str(value or "").split()
+    return words[0] if words else ""
+
 
 class HrEmployee(models.Model):
     _inherit = "hr.employee"
 
     biotime_emp_code = fields.Char(
         string="Biotime Employee Code",
-        index=True
+        index=True,
+        help="Code of the employee on BioTime, when it differs from the Emp ID."
     )
+
+    @api.model
+    @tools.ormcache()
+    def _get_biotime_code_map(self):
+        """Return {BioTime code: employee id} of active employees, built
+        with one query and cached until an employee code changes.
+
+        Both the Emp ID and the Biotime Employee Code resolve. The dict is
+        shared between callers and must not be modified.
+        """
+        fnames = [fname for fname in BIOTIME_CODE_FIELDS if fname in self._fields]
+        if not fnames:
+            return {}
+        domain = [(fname, '!=', False) for fname in fnames]
+        rows = self.sudo().with_context(active_test=True).search_read(
+            ['|'] * (len(domain) - 1) + domain, fnames, order='id',
+        )
+        code_map = {}
+        for row in rows:
+            for fname in fnames:
+                code = normalize_emp_code(row[fname])
+                if not code:
+                    continue
+                if code_map.setdefault(code, row['id']) != row['id']:
+                    _logger.warning(
+                        f"Biotime code {code} is used by several employees, "
+                        f"resolved to employee {code_map[code]}"
+                    )
+        return code_map
+
+    def _biotime_code_state(self):
+        """{employee id: (active, codes)} of these employees having a
+        BioTime code: what the code map is built from."""
+        fnames = [fname for fname in BIOTIME_CODE_FIELDS if fname in self._fields]
+        state = {}
+        for rec in self:
+            codes = tuple(normalize_emp_code(rec[fname]) for fname in fnames)
+            if any(codes):
+                state[rec.id] = (rec.active, codes)
+        return state
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        if employees._biotime_code_state():
+            self.env.registry.clear_cache()
+        return employees
+
+    def write(self, vals):
+        # the code map is in the registry-wide default cache: only reset it
+        # when a BioTime code, or the active flag of a coded employee, changes
+        if 'active' not in vals and not any(fname in vals for fname in BIOTIME_CODE_FIELDS):
+            return super().write(vals)
+        before = self._biotime_code_state()
+        res = super().write(vals)
+        if self._biotime_code_state() != before:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        has_codes = bool(self._biotime_code_state())
+        res = super().unlink()
+        if has_codes:
+            self.env.registry.clear_cache()
+        return res
@@ -0,0 +1,36 @@
+/** @odoo-module **/
+
+import { onMounted, onWillUnmount } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { ProgressBarField, progressBarField } from "@web/views/fields/progress_bar/progress_bar_field";
+
+const POLL_DELAY = 2000;
+
+/**
+ * Progress bar of a biotime.job that reloads the record every few seconds
+ * while the job is queued or running.
+ */
+export class BiotimeJobProgressField extends ProgressBarField {
+    setup() {
+        super.setup();
+        onMounted(() => {
+            this.interval = setInterval(() => this.poll(), POLL_DELAY);
+        });
+        onWillUnmount(() => clearInterval(this.interval));
+    }
+
+    async poll() {
+        const record = this.props.record;
+        if (!["queued", "running"].includes(record.data.state) || record.dirty) {
+            return;
+        }
+        await record.load();
+    }
+}
+
+export const biotimeJobProgressField = {
+    ...progressBarField,
+    component: BiotimeJobProgressField,
+};
+
+registry.category("fields").add("biotime_job_progress", biotimeJobProgressField);
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Benchmark of the BioTime attendance ingestion, without a BioTime server.
+
+Runs against an Odoo database where l4e_biotime_connector is installed.
+For every size, synthetic employees and punches are generated and imported
+in one transaction that is rolled back afterwards, so the database is left
+unchanged::
+
+    python benchmark_ingestion.py -c /etc/odoo/odoo.conf -d mydb
+    python benchmark_ingestion.py -c odoo.conf -d mydb --sizes 10000 100000 1000000 \\
+        --employees 1000 --mode direct --trace-memory
+
+Modes:
+
+``http``   (default) starts fake_biotime_server.py in-process and runs the
+           full ``_sync_attendance`` of a temporary biotime.server pointing
+           at it: HTTP client, paging, cursor and ingestion.
+``direct`` feeds generated pages straight to ``_ingest_pages``, to measure
+           the database side alone.
+
+``--fixture`` replays a fixture recorded by ``fake_biotime_server.py record``
+instead of synthetic punches (employees are created for its codes).
+
+Reported per run: wall time, SQL queries issued by the transaction, punch
+lines imported, peak RSS of the process and, with ``--trace-memory``, the
+peak of Python allocations during the run (slower).
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tracemalloc
+from collections import Counter
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_biotime_server import FakeBiotimeServer, generate_transactions  # noqa: E402
+
+
+def _odoo_env(config_file, db_name):
+    import odoo
+    from odoo import api, SUPERUSER_ID
+    from odoo.modules.registry import Registry
+
+    args = ['-d', db_name]
+    if config_file:
+        args = ['-c', config_file] + args
+    odoo.tools.config.parse_config(args)
+    registry = Registry(db_name)
+    cr = registry.cursor()
+    return api.Environment(cr, SUPERUSER_ID, {}), cr
+
+
+def _create_employees(env, codes):
+    Employee = env['hr.employee']
+    if 'x_studio_emp_id' not in Employee._fields:
+        sys.exit("hr.employee has no x_studio_emp_id field on this database")
+    existing = set(Employee.search([('x_studio_emp_id', 'in', codes)]).mapped('x_studio_emp_id'))
+    Employee.create([
+        {'name': f"Benchmark {code}", 'x_studio_emp_id': code}
+        for code in codes if code not in existing
+    ])
+
+
+def run_once(env, cr, transactions, mode, page_size, trace_memory):
+    Service = env['biotime.service']
+    stats = Counter()
+    Service = Service.with_context(biotime_run_stats=stats)
+
+    _create_employees(env, sorted({str(tx['emp_code']) for tx in transactions}))
+    env.flush_all()
+
+    ICP = env['ir.config_parameter']
+    ICP.set_param('biotime.page_size', page_size)
+    ICP.set_param('biotime.max_pages', len(transactions) // page_size + 2)
+
+    server_ctx = None
+    if mode == 'http':
+        server_ctx = FakeBiotimeServer({'transactions': transactions}).start()
+    server = env['biotime.server'].create({
+        'name': "Benchmark",
+        'base_url': server_ctx.url if server_ctx else "http://127.0.0.1:9",
+        'username': "benchmark",
+        'password': "benchmark",
+        'tz': "Asia/Kolkata",
+        # start from the first punch instead of today
+        'last_punch_time': min(tx['punch_time'] for tx in transactions),
+    })
+    env.flush_all()
+
+    if trace_memory:
+        tracemalloc.start()
+    queries_before = cr.sql_log_count
+    start = perf_counter()
+    try:
+        if mode == 'http':
+            Service._sync_attendance(server)
+        else:
+            pages = (
+                transactions[i:i + page_size]
+                for i in range(0, len(transactions), page_size)
+            )
+            Service._ingest_pages(pages, server)
+        env.flush_all()
+    finally:
+        wall = perf_counter() - start
+        queries = cr.sql_log_count - queries_before
+        peak_alloc = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        if server_ctx:
+            server_ctx.stop()
+
+    return {
+        'wall': wall,
+        'queries': queries,
+        'imported': stats['tx_imported'],
+        'http_time': stats['http_time'],
+        'db_time': stats['db_time'],
+        'peak_alloc': peak_alloc,
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--employees', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--mode', choices=('http', 'direct'), default='http')
+    parser.add_argument('--fixture', help="replay this recorded fixture instead of --sizes")
+    parser.add_argument('--trace-memory', action='store_true')
+    args = parser.parse_args()
+
+    # punches are generated when their run starts, one size in memory at a time
+    if args.fixture:
+        def load_fixture():
+            with open(args.fixture) as f:
+                return json.load(f).get('transactions', [])
+        runs = [('fixture', load_fixture)]
+    else:
+        runs = [
+            (str(size), lambda size=size: generate_transactions(size, min(args.employees, size)))
+            for size in args.sizes
+        ]
+
+    env, cr = _odoo_env(args.config, args.database)
+    print(f"{'punches':>10} {'imported':>10} {'wall s':>9} {'queries':>9} "
+          f"{'http s':>8} {'db s':>8} {'peak alloc MB':>14} {'max RSS MB':>11}")
+    try:
+        for label, make_transactions in runs:
+            transactions = make_transactions()
+            try:
+                result = run_once(env, cr, transactions, args.mode, args.page_size, args.trace_memory)
+            finally:
+                cr.rollback()
+                env.invalidate_all()
+                # the employee code map may hold rolled back employees
+                env.registry.clear_cache()
+            peak = f"{result['peak_alloc'] / 2**20:.1f}" if result['peak_alloc'] is not None else "-"
+            print(f"{label:>10} {result['imported']:>10} {result['wall']:>9.2f} "
+                  f"{result['queries']:>9} {result['http_time']:>8.2f} {result['db_time']:>8.2f} "
+                  f"{peak:>14} {result['max_rss'] / 1024:>11.1f}")
+    finally:
+        cr.close()
+
+
+if __name__ == '__main__':
+    main()
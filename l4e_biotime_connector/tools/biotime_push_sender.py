@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Stand-in for a BioTime server pushing transactions to Odoo.
+
+Posts batches of transactions to the push receiver of a biotime.server
+(``/biotime/push/<server id>``), either read from a JSON file (a list of
+transactions or a ``{"data": [...]}`` page of the transactions API) or
+generated for the given employee codes::
+
+    python biotime_push_sender.py http://localhost:8069/biotime/push/1 \\
+        --secret XXXX --emp-code 1001 --emp-code 1002 --count 20
+
+Only needs ``requests``; it does not import Odoo.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+
+def generate_transactions(emp_codes, count, start_id, start_time, interval):
+    transactions = []
+    punch_time = start_time
+    for i in range(count):
+        transactions.append({
+            'id': start_id + i,
+            'emp_code': emp_codes[i % len(emp_codes)],
+            'punch_time': punch_time.strftime("%Y-%m-%d %H:%M:%S"),
+            'punch_state': '0',
+            'terminal_sn': 'STANDIN0001',
+            'terminal_alias': 'Push stand-in',
+        })
+        punch_time += timedelta(seconds=interval)
+    return transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('url', help="push URL shown on the Biotime server form")
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--file', help="JSON file with the transactions to send")
+    parser.add_argument('--emp-code', action='append', default=[],
+                        help="employee code of generated punches (repeatable)")
+    parser.add_argument('--count', type=int, default=10, help="generated transactions")
+    parser.add_argument('--start-id', type=int, default=int(time.time()),
+                        help="id of the first generated transaction")
+    parser.add_argument('--start-time', default=None,
+                        help="BioTime local time of the first punch (YYYY-MM-DD HH:MM:SS), default now")
+    parser.add_argument('--interval', type=int, default=60, help="seconds between generated punches")
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            payload = json.load(f)
+        transactions = payload.get('data', []) if isinstance(payload, dict) else payload
+    elif args.emp_code:
+        start_time = (
+            datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S")
+            if args.start_time else datetime.now().replace(microsecond=0)
+        )
+        transactions = generate_transactions(
+            args.emp_code, args.count, args.start_id, start_time, args.interval
+        )
+    else:
+        parser.error("give --file or at least one --emp-code")
+
+    session = requests.Session()
+    session.headers['X-Biotime-Secret'] = args.secret
+    for i in range(0, len(transactions), args.batch_size):
+        batch = transactions[i:i + args.batch_size]
+        start = time.perf_counter()
+        res = session.post(args.url, json=batch, timeout=60)
+        elapsed = time.perf_counter() - start
+        print(f"batch {i // args.batch_size + 1}: HTTP {res.status_code} in {elapsed:.2f}s {res.text}")
+        if res.status_code != 200:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Local fake BioTime server for offline replay and benchmarks.
+
+Serves ``/iclock/api/transactions/``, ``/iclock/api/terminals/`` and
+``/iclock/api/biodatas/`` like the BioTime REST API (``count`` / ``next`` /
+``data`` pages, ``page`` and ``page_size`` parameters, ``id__gt``,
+``start_time`` and ``end_time`` filters on transactions), from a recorded fixture or from
+synthetic punches. Credentials are not checked.
+
+    # capture pages of a real server into a fixture
+    python fake_biotime_server.py record --url http://biotime:8081 \\
+        --username admin --password XXX --start-time "2025-01-01 00:00:00" --out fixture.json
+
+    # replay it, or serve synthetic punches, on http://127.0.0.1:8099
+    python fake_biotime_server.py serve --fixture fixture.json
+    python fake_biotime_server.py serve --punches 100000 --employees 500
+
+Point a biotime.server record at the printed URL to run the connector
+against it. The module can also be imported: see ``FakeBiotimeServer``
+and ``generate_transactions`` (used by benchmark_ingestion.py).
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qs
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+
+def emp_code(index):
+    return f"BM{index:05d}"
+
+
+def generate_transactions(punches, employees, start=None, start_id=1, per_day=4):
+    """Return ``punches`` synthetic transactions, oldest first.
+
+    Each of ``employees`` employees punches ``per_day`` times a day between
+    08:00 and 20:00, on as many consecutive days as needed.
+    """
+    start = start or datetime(2025, 1, 1)
+    step = timedelta(hours=12) / per_day
+    transactions = []
+    day, slot, employee = 0, 0, 0
+    for i in range(punches):
+        punch_time = (
+            start + timedelta(days=day, hours=8) + slot * step
+            + timedelta(seconds=employee % 3600)
+        )
+        transactions.append({
+            'id': start_id + i,
+            'emp_code': emp_code(employee + 1),
+            'punch_time': punch_time.strftime("%Y-%m-%d %H:%M:%S"),
+            'punch_state': '0',
+            'verify_type': 1,
+            'terminal_sn': f"FAKE{employee % 4:04d}",
+            'terminal_alias': f"Fake terminal {employee % 4}",
+        })
+        employee += 1
+        if employee == employees:
+            employee = 0
+            slot += 1
+            if slot == per_day:
+                slot = 0
+                day += 1
+    return transactions
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    server_version = "FakeBiotime/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+
+        rows = self.server.fixture.get(endpoint)
+        if rows is None:
+            self.send_error(404)
+            return
+
+        if endpoint == 'transactions':
+            if query.get('id__gt'):
+                try:
+                    last_id = int(query['id__gt'])
+                except ValueError:
+                    self.send_error(400)
+                    return
+                rows = [r for r in rows if r['id'] > last_id]
+            if query.get('start_time'):
+                rows = [r for r in rows if r.get('punch_time', '') >= query['start_time']]
+            if query.get('end_time'):
+                rows = [r for r in rows if r.get('punch_time', '') <= query['end_time']]
+
+        try:
+            page = max(1, int(query.get('page', 1)))
+            page_size = min(MAX_PAGE_SIZE, max(1, int(query.get('page_size', DEFAULT_PAGE_SIZE))))
+        except ValueError:
+            self.send_error(400)
+            return
+
+        offset = (page - 1) * page_size
+        data = rows[offset:offset + page_size]
+        next_url = None
+        if offset + page_size < len(rows):
+            next_url = f"http://{self.headers.get('Host')}{parsed.path}?" + urlencode(
+                dict(query, page=page + 1)
+            )
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = json.dumps({
+            'count': len(rows),
+            'next': next_url,
+            'previous': None,
+            'data': data,
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeBiotimeServer(ThreadingHTTPServer):
+    """In-process fake BioTime server, started in a daemon thread::
+
+        with FakeBiotimeServer({'transactions': txs}) as server:
+            ... server.url ...
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fixture, host="127.0.0.1", port=0, latency=0.0, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.fixture = {
+            'transactions': sorted(fixture.get('transactions', []), key=lambda r: r['id']),
+            'terminals': fixture.get('terminals', []),
+            'biodatas': fixture.get('biodatas', []),
+        }
+        self.latency = latency
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record(url, username, password, start_time, out, max_pages):
+    """Capture transaction, terminal and biodata pages of a real server."""
+    import requests
+
+    session = requests.Session()
+    session.auth = (username, password)
+    base_url = url.rstrip("/")
+    fixture = {}
+    endpoints = {
+        'transactions': {'ordering': 'id', 'start_time': start_time, 'page_size': 100},
+        'terminals': {},
+        'biodatas': {},
+    }
+    for endpoint, query in endpoints.items():
+        next_url = f"{base_url}/iclock/api/{endpoint}/?{urlencode(query)}"
+        rows = []
+        for _page in range(max_pages):
+            if not next_url:
+                break
+            res = session.get(next_url, timeout=60)
+            res.raise_for_status()
+            payload = res.json()
+            rows.extend(payload.get('data', []))
+            next_url = payload.get('next')
+            if next_url and next_url.startswith("/"):
+                next_url = base_url + next_url
+        fixture[endpoint] = rows
+        print(f"{endpoint}: {len(rows)} rows")
+
+    with open(out, 'w') as f:
+        json.dump(fixture, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="serve a fixture or synthetic punches")
+    serve.add_argument('--fixture', help="JSON fixture written by 'record'")
+    serve.add_argument('--punches', type=int, default=10000)
+    serve.add_argument('--employees', type=int, default=200)
+    serve.add_argument('--host', default="127.0.0.1")
+    serve.add_argument('--port', type=int, default=8099)
+    serve.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument('--verbose', action='store_true')
+
+    rec = sub.add_parser('record', help="capture a real server into a fixture")
+    rec.add_argument('--url', required=True)
+    rec.add_argument('--username', required=True)
+    rec.add_argument('--password', required=True)
+    rec.add_argument('--start-time', required=True, help="YYYY-MM-DD HH:MM:SS")
+    rec.add_argument('--max-pages', type=int, default=1000)
+    rec.add_argument('--out', required=True)
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.url, args.username, args.password, args.start_time, args.out, args.max_pages)
+        return
+
+    if args.fixture:
+        with open(args.fixture) as f:
+            fixture = json.load(f)
+    else:
+        fixture = {'transactions': generate_transactions(args.punches, args.employees)}
+
+    server = FakeBiotimeServer(
+        fixture, host=args.host, port=args.port,
+        latency=args.latency, verbose=args.verbose,
+    )
+    print(f"Fake BioTime server on {server.url} "
+          f"({len(server.fixture['transactions'])} transactions)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()